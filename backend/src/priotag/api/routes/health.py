@@ -1,6 +1,6 @@
 """Health check endpoints."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
 router = APIRouter()
 
@@ -8,9 +8,11 @@ router = APIRouter()
 @router.get(
     "/health",
     status_code=200,
+    response_class=Response,
     summary="Health Check",
     description="Check if the API is running and healthy",
 )
 async def health_check():
     """Health check endpoint."""
-    return
+    # Probes only look at the status, so skip JSON serialization of a body
+    return Response(status_code=200)
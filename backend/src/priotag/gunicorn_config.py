@@ -1,4 +1,5 @@
 import logging
+import os
 
 
 class HealthCheckFilter(logging.Filter):
@@ -13,7 +14,8 @@ class HealthCheckFilter(logging.Filter):
 
 # Gunicorn configuration
 bind = "0.0.0.0:8000"
-workers = 4
+# WEB_CONCURRENCY is gunicorn's conventional worker count variable
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
 worker_class = "uvicorn.workers.UvicornWorker"
 timeout = 60
 keepalive = 5
@@ -17,12 +17,21 @@ from priotag.middleware.metrics import (
     track_csp_violation,
 )
 from priotag.middleware.security_headers import SecurityHeadersMiddleware
+from priotag.services.pocketbase_service import close_pocketbase_client
 from priotag.services.redis_service import close_redis, redis_health_check
 from priotag.static_files_utils import setup_static_file_serving
 
 ENV = os.getenv("ENV", "production")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG" if ENV == "development" else "INFO")
 SERVE_STATIC = os.getenv("SERVE_STATIC", "false").lower() == "true"
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "")
+# Methods and request headers used by the API and frontend; listing them lets
+# preflights be answered without echoing the requested headers
+CORS_ALLOW_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+CORS_ALLOW_HEADERS = ["Content-Type"]
+# Let browsers reuse preflight results (Chromium caps this at two hours)
+CORS_MAX_AGE = 7200
+STATIC_PATH = Path("/app/static")
 setup_logging(LOG_LEVEL)
 
 
@@ -44,69 +53,10 @@ async def lifespan(app: FastAPI):
     # Shutdown: close connections
     close_redis()
     print("✓ Redis connections closed")
+    await close_pocketbase_client()
+    print("✓ PocketBase connections closed")
 
 
-# Create FastAPI app
-app = FastAPI(
-    title="PrioTag API",
-    description="API for analyzing images and PDFs with Excel output generation",
-    version="0.1.0",
-    docs_url=None if ENV == "production" else "/api/docs",
-    redoc_url=None if ENV == "production" else "/api/redoc",
-    lifespan=lifespan,
-)
-
-
-# CORS configuration
-if ENV == "development":
-    # In development, allow frontend dev server
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=[
-            "http://localhost:5173",  # Vite dev server
-            "http://localhost:5174",  # Vite dev server
-            "http://127.0.0.1:5173",
-        ],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
-else:
-    # Production CORS
-    allowed_origins = os.getenv("CORS_ORIGINS", "").split(",")
-    if allowed_origins:
-        app.add_middleware(
-            CORSMiddleware,
-            allow_origins=allowed_origins,
-            allow_credentials=True,
-            allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            allow_headers=["*"],
-        )
-
-static_path = Path("/app/static")
-
-app.add_middleware(PrometheusMetricsMiddleware)
-
-app.add_middleware(
-    SecurityHeadersMiddleware,
-    static_path=static_path,
-    enable_hsts=(ENV == "production"),
-    csp_report_uri="/api/csp-violations",
-)
-
-# API routes
-app.include_router(health.router, prefix="/api/v1", tags=["Health"])
-app.include_router(priorities.router, prefix="/api/v1/priorities", tags=["Prioliste"])
-app.include_router(auth.router, prefix="/api/v1/auth", tags=["Pocketbase"])
-app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
-app.include_router(
-    vacation_days.router, prefix="/api/v1/admin", tags=["Vacation Days Admin"]
-)
-app.include_router(vacation_days.user_router, prefix="/api/v1", tags=["Vacation Days"])
-app.include_router(account.router, prefix="/api/v1/account", tags=["Account"])
-
-
-@app.post("/api/csp-violations")
 async def csp_violation_report(request: Request):
     report = await request.json()
     violated_directive = report.get("violated-directive", "unknown")
@@ -120,26 +70,112 @@ async def csp_violation_report(request: Request):
 metrics_token_file = Path("/run/secrets/metrics_token")
 if not metrics_token_file.exists():
     logger.warning("Missing metrics token file")
+    METRICS_TOKEN: str | None = None
 else:
     METRICS_TOKEN = metrics_token_file.read_text().strip()
 
 security = HTTPBearer()
 
 
-@app.get("/api/v1/metrics")
-async def metrics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def get_metrics_token() -> str | None:
+    """Dependency providing the expected metrics bearer token."""
+    return METRICS_TOKEN
+
+
+async def metrics(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    expected_token: str | None = Depends(get_metrics_token),
+):
     """Prometheus metrics endpoint"""
-    if credentials.credentials != METRICS_TOKEN:
+    if expected_token is None or credentials.credentials != expected_token:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid metrics token"
         )
     return await metrics_endpoint()
 
 
-# Serve static files in production OR when explicitly enabled in development
-setup_static_file_serving(
-    app=app, static_path=static_path, env=ENV, serve_static=SERVE_STATIC
-)
+def create_app(
+    env: str = ENV,
+    cors_origins: str = CORS_ORIGINS,
+    serve_static: bool = SERVE_STATIC,
+    static_path: Path = STATIC_PATH,
+) -> FastAPI:
+    """Build the FastAPI application for the given environment settings."""
+    app = FastAPI(
+        title="PrioTag API",
+        description="API for analyzing images and PDFs with Excel output generation",
+        version="0.1.0",
+        docs_url=None if env == "production" else "/api/docs",
+        redoc_url=None if env == "production" else "/api/redoc",
+        lifespan=lifespan,
+    )
+
+    # CORS configuration
+    if env == "development":
+        # In development, allow frontend dev server
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=[
+                "http://localhost:5173",  # Vite dev server
+                "http://localhost:5174",  # Vite dev server
+                "http://127.0.0.1:5173",
+            ],
+            allow_credentials=True,
+            allow_methods=CORS_ALLOW_METHODS,
+            allow_headers=CORS_ALLOW_HEADERS,
+            max_age=CORS_MAX_AGE,
+        )
+    else:
+        # Production CORS
+        allowed_origins = [
+            origin.strip() for origin in cors_origins.split(",") if origin.strip()
+        ]
+        if allowed_origins:
+            app.add_middleware(
+                CORSMiddleware,
+                allow_origins=allowed_origins,
+                allow_credentials=True,
+                allow_methods=CORS_ALLOW_METHODS,
+                allow_headers=CORS_ALLOW_HEADERS,
+                max_age=CORS_MAX_AGE,
+            )
+
+    app.add_middleware(PrometheusMetricsMiddleware)
+
+    app.add_middleware(
+        SecurityHeadersMiddleware,
+        static_path=static_path,
+        enable_hsts=(env == "production"),
+        csp_report_uri="/api/csp-violations",
+    )
+
+    # API routes
+    app.include_router(health.router, prefix="/api/v1", tags=["Health"])
+    app.include_router(
+        priorities.router, prefix="/api/v1/priorities", tags=["Prioliste"]
+    )
+    app.include_router(auth.router, prefix="/api/v1/auth", tags=["Pocketbase"])
+    app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
+    app.include_router(
+        vacation_days.router, prefix="/api/v1/admin", tags=["Vacation Days Admin"]
+    )
+    app.include_router(
+        vacation_days.user_router, prefix="/api/v1", tags=["Vacation Days"]
+    )
+    app.include_router(account.router, prefix="/api/v1/account", tags=["Account"])
+
+    app.post("/api/csp-violations")(csp_violation_report)
+    app.get("/api/v1/metrics")(metrics)
+
+    # Serve static files in production OR when explicitly enabled in development
+    setup_static_file_serving(
+        app=app, static_path=static_path, env=env, serve_static=serve_static
+    )
+
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
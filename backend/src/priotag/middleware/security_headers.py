@@ -284,7 +284,7 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         # Check if relaxed CSP should be used
         use_relaxed_csp = self._should_use_relaxed_csp(path)
         if use_relaxed_csp:
-            logger.debug(f"Applied relaxed CSP for {path}")
+            logger.debug("Applied relaxed CSP for %s", path)
             return response
 
         # Only add headers to HTML responses and API responses
@@ -2,7 +2,7 @@
 
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from priotag.models.pocketbase_schemas import UsersResponse
 
@@ -59,6 +59,9 @@ class LoginResponse(BaseModel):
 
 
 class SessionInfo(BaseModel):
+    # Built once per authenticated request and only read afterwards
+    model_config = ConfigDict(frozen=True)
+
     id: str
     username: str
     is_admin: bool
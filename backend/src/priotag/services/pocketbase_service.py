@@ -1,3 +1,32 @@
+import asyncio
 import os
 
+import httpx
+
 POCKETBASE_URL = os.getenv("POCKETBASE_URL", "http://pocketbase:8090")
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_pocketbase_client() -> httpx.AsyncClient:
+    """Shared PocketBase client, keeping connections alive between requests
+
+    Pooled connections belong to the event loop that opened them, so a new
+    client is created when called from a different loop.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=100))
+        _client_loop = loop
+    return _client
+
+
+async def close_pocketbase_client() -> None:
+    """Close the shared PocketBase client and its pooled connections"""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
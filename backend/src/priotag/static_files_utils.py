@@ -5,39 +5,83 @@ This module provides path validation and file serving logic with protection agai
 path traversal attacks, symlink attacks, and other file system vulnerabilities.
 """
 
+import functools
 import logging
+import mimetypes
+import os
+import re
+import stat
+import string
 import unicodedata
+from collections import deque
+from collections.abc import Iterator
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.types import Scope
 
 logger = logging.getLogger(__name__)
 
-ALLOWED_EXTENSIONS = {
-    ".html",
-    ".css",
-    ".js",
-    ".json",
-    ".svg",
-    ".png",
-    ".jpg",
-    ".jpeg",
-    ".gif",
-    ".woff",
-    ".woff2",
-    ".ttf",
-    ".ico",
-    ".webp",
-    ".map",
-    ".txt",
-    ".xml",
-    ".pdf",
-    ".webm",
-    ".mp4",
-    ".avif",
-}
+ALLOWED_EXTENSIONS = frozenset(
+    {
+        ".html",
+        ".css",
+        ".js",
+        ".json",
+        ".svg",
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".woff",
+        ".woff2",
+        ".ttf",
+        ".ico",
+        ".webp",
+        ".map",
+        ".txt",
+        ".xml",
+        ".pdf",
+        ".webm",
+        ".mp4",
+        ".avif",
+    }
+)
+
+# Extensions that must not appear anywhere in a served file name
+_DANGEROUS_EXTENSIONS = frozenset(
+    {
+        ".php",
+        ".py",
+        ".sh",
+        ".exe",
+        ".bat",
+        ".cmd",
+        ".pl",
+        ".cgi",
+        ".asp",
+        ".aspx",
+        ".jsp",
+    }
+)
+
+# Dot-delimited forms of the dangerous extensions, matched against a file's
+# padded extension chain
+_DANGEROUS_TOKENS = tuple(f"{ext}." for ext in sorted(_DANGEROUS_EXTENSIONS))
+
+# Static subdirectories mounted directly, with their route names and whether
+# they hold content-hashed build output
+_MOUNTED_DIRECTORIES = (("_app", "static_app", True), ("assets", "assets", False))
+
+# SvelteKit puts content-hashed build output under _app/immutable, so those
+# files never change under the same URL and browsers may cache them for good
+_IMMUTABLE_PREFIX = "immutable" + os.sep
+_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Pre-compressed sibling suffixes by content coding, in order of preference
+_PRECOMPRESSED_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
 
 # Maximum file size to serve (10MB default)
 MAX_FILE_SIZE = 10 * 1024 * 1024
@@ -45,85 +89,113 @@ MAX_FILE_SIZE = 10 * 1024 * 1024
 # Maximum path depth to prevent deeply nested paths
 MAX_PATH_DEPTH = 10
 
+# A single path component: whitelisted characters only, no leading dot (hidden
+# files, "." and "..") and no consecutive dots. Null bytes, separators, "%"
+# escapes and "~" all fall outside the whitelist.
+_SAFE_COMPONENT_PATTERN = r"[A-Za-z0-9_-](?:\.?[A-Za-z0-9_-])*\.?"
+
+# Translation table deleting every whitelisted character: a component is made
+# of whitelisted characters only if translating it leaves nothing behind
+_STRIP_WHITELIST = str.maketrans("", "", string.ascii_letters + string.digits + "._-")
+
+# A whole relative path of safe components, at most MAX_PATH_DEPTH deep
+_SAFE_PATH_RE = re.compile(
+    rf"{_SAFE_COMPONENT_PATTERN}"
+    rf"(?:/{_SAFE_COMPONENT_PATTERN}){{0,{MAX_PATH_DEPTH - 1}}}"
+)
+
+# Windows reserved device names
+_WINDOWS_RESERVED_NAMES = frozenset(
+    {
+        "con",
+        "prn",
+        "aux",
+        "nul",
+        *(f"com{i}" for i in range(1, 10)),
+        *(f"lpt{i}" for i in range(1, 10)),
+    }
+)
+
 
 def normalize_unicode(text: str) -> str:
     """Normalize unicode to prevent homograph and normalization attacks."""
+    # Pure ASCII is already in NFKC form, skip the table walk
+    if text.isascii():
+        return text
     # Use NFKC normalization to handle various unicode representations
     return unicodedata.normalize("NFKC", text)
 
 
 def validate_path_component(component: str) -> str | None:
     """Validate a single path component and return sanitized version."""
-    if not component or component == "." or component == "..":
-        return None
-
     # Normalize unicode first to prevent bypass attempts
     component = normalize_unicode(component)
 
-    # Check for null bytes and path separators (including URL-encoded versions)
-    forbidden_chars = ["\x00", "/", "\\", "%00", "%2f", "%2F", "%5c", "%5C"]
-    for char in forbidden_chars:
-        if char.lower() in component.lower():
-            return None
-
-    # Block hidden files and files with suspicious patterns
-    if component.startswith(".") or component.startswith("~"):
+    # Strict character whitelist
+    if not component or component.translate(_STRIP_WHITELIST):
         return None
 
-    # Prevent Windows reserved names
-    windows_reserved = {
-        "con",
-        "prn",
-        "aux",
-        "nul",
-        "com1",
-        "com2",
-        "com3",
-        "com4",
-        "com5",
-        "com6",
-        "com7",
-        "com8",
-        "com9",
-        "lpt1",
-        "lpt2",
-        "lpt3",
-        "lpt4",
-        "lpt5",
-        "lpt6",
-        "lpt7",
-        "lpt8",
-        "lpt9",
-    }
-    if component.lower().split(".")[0] in windows_reserved:
+    # Block hidden files, "." and "..", and multiple consecutive dots
+    if component.startswith(".") or ".." in component:
         return None
 
-    # Strict character whitelist
-    allowed_chars = set(
-        "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_."
-    )
-    if not all(c in allowed_chars for c in component):
-        return None
+    lowered = component.lower()
 
-    # Prevent multiple consecutive dots
-    if ".." in component:
+    # Prevent Windows reserved names
+    if lowered.split(".", 1)[0] in _WINDOWS_RESERVED_NAMES:
         return None
 
-    return component.lower()
+    return lowered
 
 
 def safe_join_path(base: Path, user_input: str) -> Path | None:
     """Safely join user input to base path by validating each component."""
+    result = _safe_join_cached(str(base), user_input)
+    return Path(result) if result is not None else None
+
+
+@functools.lru_cache(maxsize=4096)
+def _safe_join_cached(base_str: str, user_input: str) -> str | None:
+    """Memoized implementation of safe_join_path working on plain strings."""
     if not user_input:
-        return base / "index.html"
+        return os.path.join(base_str, "index.html")
 
     # Normalize unicode in the entire path
     user_input = normalize_unicode(user_input)
 
     cleaned = user_input.strip().lstrip("/")
     if not cleaned:
-        return base / "index.html"
+        return os.path.join(base_str, "index.html")
+
+    # Fast path: the whole path passes the component rules in one regex scan
+    validated_parts = cleaned.lower().split("/")
+    if not _SAFE_PATH_RE.fullmatch(cleaned) or any(
+        part.split(".", 1)[0] in _WINDOWS_RESERVED_NAMES for part in validated_parts
+    ):
+        validated_parts = _validate_components(cleaned)
+        if validated_parts is None:
+            return None
 
+    result = os.path.join(base_str, *validated_parts)
+
+    try:
+        # Check if path exists before resolving to avoid information leakage
+        # Stay on strings: the base is canonicalized once per process
+        resolved = _realpath(result)
+
+        # Verify the resolved path is within base directory
+        if not _is_within(resolved, _resolved_base(base_str)):
+            logger.warning("Path traversal attempt detected")
+            return None
+
+        return resolved
+    except (ValueError, RuntimeError, OSError) as e:
+        logger.warning(f"Path resolution error: {type(e).__name__}")
+        return None
+
+
+def _validate_components(cleaned: str) -> list[str] | None:
+    """Validate a relative path component by component, logging rejections."""
     components = cleaned.split("/")
 
     # Check path depth
@@ -138,78 +210,74 @@ def safe_join_path(base: Path, user_input: str) -> Path | None:
             logger.warning(f"Invalid path component rejected: {component[:50]}")
             return None
         validated_parts.append(validated)
+    return validated_parts
 
-    result = base
-    for part in validated_parts:
-        result = result / part
 
-    try:
-        # Check if path exists before resolving to avoid information leakage
-        resolved = result.resolve(strict=False)
-        base_resolved = base.resolve()
+def clear_path_caches() -> None:
+    """Drop memoized path lookups, e.g. after the static directory changed."""
+    _safe_join_cached.cache_clear()
+    _resolved_base.cache_clear()
 
-        # Verify the resolved path is within base directory
-        if not resolved.is_relative_to(base_resolved):
-            logger.warning("Path traversal attempt detected")
-            return None
 
-        # Additional check: ensure no component in the real path contains ".."
-        try:
-            resolved.relative_to(base_resolved)
-        except ValueError:
-            logger.warning("Path validation failed during relative_to check")
-            return None
+def _realpath(path: Path | str) -> str:
+    """Canonicalize a path, resolving every symlink along the way."""
+    return os.path.realpath(path)
+
+
+@functools.lru_cache(maxsize=32)
+def _resolved_base(base: str) -> str:
+    """Canonical form of a base directory, which is fixed for the app lifetime."""
+    return _realpath(base)
 
-        return resolved
-    except (ValueError, RuntimeError, OSError) as e:
-        logger.warning(f"Path resolution error: {type(e).__name__}")
-        return None
+
+def _is_within(path: str, base: str) -> bool:
+    """Check whether a canonical path lies inside a canonical base directory."""
+    prefix = base if base.endswith(os.sep) else base + os.sep
+    return path == base or path.startswith(prefix)
 
 
 def is_safe_symlink(path: Path, base: Path) -> bool:
     """Check if a symlink is safe (points within the allowed directory)."""
-    if not path.is_symlink():
+    # A single lstat rules out regular files before any realpath walk
+    if not os.path.islink(path):
         return True
 
     try:
         # Check if symlink target is within base directory
-        target = path.resolve()
-        base_resolved = base.resolve()
-        return target.is_relative_to(base_resolved)
+        return _is_within(_realpath(path), _resolved_base(str(base)))
     except (ValueError, RuntimeError, OSError):
         return False
 
 
 def is_allowed_file(path: Path) -> bool:
     """Check if a file has an allowed extension for serving."""
-    suffix = path.suffix.lower()
-
-    # Double extension check (e.g., file.php.txt)
-    parts = path.name.lower().split(".")
-    if len(parts) > 2:
-        # Check all extensions, not just the last one
-        for i in range(1, len(parts)):
-            ext = "." + parts[i]
-            if ext not in ALLOWED_EXTENSIONS and ext in {
-                ".php",
-                ".py",
-                ".sh",
-                ".exe",
-                ".bat",
-                ".cmd",
-            }:
-                logger.warning(
-                    f"Blocked file with suspicious double extension: {path.name}"
-                )
-                return False
-
-    return suffix in ALLOWED_EXTENSIONS
-
-
-def validate_file_size(path: Path) -> bool:
-    """Check if file size is within allowed limits."""
+    name = path.name.lower()
+    # Only multi-extension names (e.g., file.php.txt) need the full chain
+    if name.count(".") > 1:
+        # Double extension check: pad the chain so every extension is ".ext."
+        chain = name[name.index(".") :] + "."
+        if any(token in chain for token in _DANGEROUS_TOKENS):
+            logger.warning(
+                f"Blocked file with suspicious double extension: {path.name}"
+            )
+            return False
+
+    return os.path.splitext(name)[1] in ALLOWED_EXTENSIONS
+
+
+def _get_size(path: Path) -> int:
+    """Return the size of a file in bytes."""
+    return os.stat(path).st_size
+
+
+def validate_file_size(path: Path, st: os.stat_result | None = None) -> bool:
+    """Check if file size is within allowed limits.
+
+    A stat result the caller already fetched can be passed as ``st`` to avoid
+    another stat call.
+    """
     try:
-        size = path.stat().st_size
+        size = st.st_size if st is not None else _get_size(path)
         if size > MAX_FILE_SIZE:
             logger.warning(f"File too large: {path} ({size} bytes)")
             return False
@@ -221,10 +289,7 @@ def validate_file_size(path: Path) -> bool:
 def validate_directory_safety(directory: Path, base: Path) -> bool:
     """Validate that a directory is safe to mount and doesn't escape base path."""
     try:
-        resolved = directory.resolve()
-        base_resolved = base.resolve()
-
-        if not resolved.is_relative_to(base_resolved):
+        if not _is_within(_realpath(directory), _resolved_base(str(base))):
             logger.warning(f"Directory outside base path: {directory}")
             return False
 
@@ -241,17 +306,59 @@ def validate_directory_safety(directory: Path, base: Path) -> bool:
         return False
 
 
+def _stat(path: Path, follow_symlinks: bool = True) -> os.stat_result | None:
+    """Stat a path, returning None if it is unreachable."""
+    try:
+        return os.stat(path, follow_symlinks=follow_symlinks)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_servable_fallback(candidate: Path, base_path: Path) -> bool:
+    """Check a directory index or .html sibling before serving it instead.
+
+    A plain file is decided from a single lstat. Only a symlink is resolved,
+    so the resolution may raise ValueError or OSError for symlinks only. The
+    candidate must therefore be built from canonical paths.
+    """
+    st = _stat(candidate, follow_symlinks=False)
+    is_link = st is not None and stat.S_ISLNK(st.st_mode)
+    if is_link:
+        st = _stat(candidate)
+    if st is None or not stat.S_ISREG(st.st_mode):
+        return False
+
+    resolved = _realpath(candidate) if is_link else str(candidate)
+    return (
+        _is_within(resolved, _resolved_base(str(base_path)))
+        and is_allowed_file(candidate)
+        and (not is_link or is_safe_symlink(candidate, base_path))
+        and validate_file_size(candidate, st)
+    )
+
+
 def find_file_to_serve(base_path: Path, validated_path: Path) -> Path | None:
     """Find the appropriate file to serve for a validated request path."""
+    # validated_path is canonical (safe_join_path resolves it), so the base is
+    # too; the fallback candidates below are then canonical without a realpath
+    base_path = Path(_resolved_base(str(base_path)))
+
+    # One lstat call decides between the file and directory branches and
+    # provides the size for validate_file_size. Only a symlink needs a second
+    # stat of its target and the symlink safety check.
+    st = _stat(validated_path, follow_symlinks=False)
+    is_link = st is not None and stat.S_ISLNK(st.st_mode)
+    if is_link:
+        st = _stat(validated_path)
 
     # Check if it's a regular file (not a symlink to a directory or device)
-    if validated_path.is_file():
+    if st is not None and stat.S_ISREG(st.st_mode):
         # Verify symlink safety
-        if not is_safe_symlink(validated_path, base_path):
+        if is_link and not is_safe_symlink(validated_path, base_path):
             logger.warning(f"Blocked serving unsafe symlink: {validated_path}")
             return None
 
-        if is_allowed_file(validated_path) and validate_file_size(validated_path):
+        if is_allowed_file(validated_path) and validate_file_size(validated_path, st):
             return validated_path
         else:
             logger.warning(
@@ -259,52 +366,200 @@ def find_file_to_serve(base_path: Path, validated_path: Path) -> Path | None:
             )
             return None
 
-    # Directory handling
-    if validated_path.is_dir():
-        index_file = validated_path / "index.html"
-        if index_file.is_file():
-            try:
-                index_resolved = index_file.resolve()
-                base_resolved = base_path.resolve()
-                if (
-                    index_resolved.is_relative_to(base_resolved)
-                    and is_allowed_file(index_file)
-                    and is_safe_symlink(index_file, base_path)
-                    and validate_file_size(index_file)
-                ):
-                    return index_file
-            except (ValueError, OSError):
-                logger.warning(f"Index file validation failed: {index_file.name}")
-
-    # Try .html extension
-    html_file = validated_path.parent / f"{validated_path.name}.html"
-    try:
-        if html_file.is_file():
-            html_resolved = html_file.resolve()
-            base_resolved = base_path.resolve()
+    # Fallbacks in order: a directory's index.html, the .html sibling, then
+    # the root index
+    candidates = [
+        validated_path.parent / f"{validated_path.name}.html",
+        base_path / "index.html",
+    ]
+    if st is not None and stat.S_ISDIR(st.st_mode):
+        candidates.insert(0, validated_path / "index.html")
+
+    for candidate in candidates:
+        try:
+            if _is_servable_fallback(candidate, base_path):
+                return candidate
+        except (ValueError, OSError):
+            logger.warning(f"Fallback file validation failed: {candidate.name}")
+
+    return None
+
+
+def _walk_files(root: Path) -> Iterator[tuple[str, os.DirEntry[str]]]:
+    """Yield (relative path, entry) for every non-directory entry under root.
+
+    Directories are recognized from the scandir entry type without a stat
+    call. Symlinked directories are not descended into, like os.walk.
+    """
+    pending = deque([("", str(root))])
+    while pending:
+        rel_dir, directory = pending.popleft()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((rel, entry.path))
+                    else:
+                        yield rel, entry
+        except OSError:
+            continue
+
+
+def build_static_manifest(static_root: Path) -> dict[str, Path | None]:
+    """Index every file under the static root by its relative path.
+
+    Servable files map to their path. Files that exist but must not be served
+    (disallowed type, oversized or unsafe symlink) map to None. Extensionless
+    routes are added up front: "page" maps to "page.html" and "docs" to
+    "docs/index.html", with real files taking precedence over both.
+    """
+    files: dict[str, Path | None] = {}
+    for rel, entry in _walk_files(static_root):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        path = Path(entry.path)
+        servable = (
+            is_allowed_file(path)
+            and is_safe_symlink(path, static_root)
+            and validate_file_size(path, st)
+        )
+        files[rel] = path if servable else None
+
+    # Same precedence as find_file_to_serve: the file itself, then a
+    # directory's index.html, then the .html sibling
+    index_suffix = os.sep + "index.html"
+    manifest: dict[str, Path | None] = {}
+    for rel, path in files.items():
+        if path is not None and rel.endswith(".html"):
+            manifest[rel.removesuffix(".html")] = path
+    for rel, path in files.items():
+        if path is not None and rel.endswith(index_suffix):
+            manifest[rel.removesuffix(index_suffix)] = path
+    manifest.update(files)
+    return manifest
+
+
+def find_file_in_manifest(
+    manifest: dict[str, Path | None], base_path: Path, validated_path: Path
+) -> Path | None:
+    """Find the file to serve using a manifest instead of the filesystem.
+
+    A path in the manifest is served, or blocked if it maps to None. Anything
+    else falls back to the root index, like find_file_to_serve.
+    """
+    prefix = os.path.join(str(base_path), "")
+    path_str = str(validated_path)
+    if not path_str.startswith(prefix):
+        return None
+    rel = path_str[len(prefix) :]
+
+    if rel in manifest:
+        return manifest[rel]
+    return manifest.get("index.html")
+
+
+def build_precompressed_variants(
+    static_root: Path, manifest: dict[str, Path | None]
+) -> dict[Path, list[tuple[str, Path]]]:
+    """Find the pre-compressed siblings of servable manifest files.
+
+    A file "app.js" with "app.js.br" or "app.js.gz" next to it maps to a list
+    of (content coding, variant path) in order of preference. Variants must be
+    regular files (not symlinks) within the size limit.
+    """
+    variants: dict[Path, list[tuple[str, Path]]] = {}
+    for rel, path in manifest.items():
+        # Skip blocked files and the synthetic extensionless routes
+        if path is None or path != static_root / rel:
+            continue
+        for encoding, suffix in _PRECOMPRESSED_SUFFIXES:
+            if rel + suffix not in manifest:
+                continue
+            variant = Path(f"{path}{suffix}")
+            st = _stat(variant, follow_symlinks=False)
             if (
-                html_resolved.is_relative_to(base_resolved)
-                and is_allowed_file(html_file)
-                and is_safe_symlink(html_file, base_path)
-                and validate_file_size(html_file)
+                st is not None
+                and stat.S_ISREG(st.st_mode)
+                and validate_file_size(variant, st)
             ):
-                return html_file
-    except (ValueError, OSError):
-        pass
-
-    # Fallback to root index
-    root_index = base_path / "index.html"
-    if (
-        root_index.is_file()
-        and is_allowed_file(root_index)
-        and is_safe_symlink(root_index, base_path)
-        and validate_file_size(root_index)
-    ):
-        return root_index
+                variants.setdefault(path, []).append((encoding, variant))
+    return variants
+
+
+def _quality(params: list[str]) -> float:
+    """Read the q weight from a coding's parameters, treating junk as 0."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _accepted_encodings(accept_encoding: str) -> tuple[set[str], set[str]]:
+    """Split the content codings a client lists into accepted and q=0 ones."""
+    accepted = set()
+    rejected = set()
+    for token in accept_encoding.split(","):
+        coding, *params = token.split(";")
+        coding = coding.strip().lower()
+        if _quality(params) > 0:
+            accepted.add(coding)
+        else:
+            rejected.add(coding)
+    return accepted, rejected
+
 
+def select_precompressed(
+    variants: list[tuple[str, Path]], accept_encoding: str
+) -> tuple[str, Path] | None:
+    """Pick the preferred pre-compressed variant the client accepts, if any.
+
+    A "*" entry only covers codings the client did not refuse with q=0.
+    """
+    if not variants or not accept_encoding:
+        return None
+    accepted, rejected = _accepted_encodings(accept_encoding)
+    for encoding, variant in variants:
+        if encoding in accepted or ("*" in accepted and encoding not in rejected):
+            return encoding, variant
     return None
 
 
+class BuildStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers cache content-hashed build output.
+
+    Responses for files under immutable/ get a one-year immutable
+    Cache-Control header, so clients stop revalidating them. Only mount it
+    over the _app build directory, whose immutable/ files are hashed.
+    """
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if self.get_path(scope).startswith(_IMMUTABLE_PREFIX):
+            response.headers["Cache-Control"] = _IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def _list_entries(directory: Path) -> dict[str, os.DirEntry[str]]:
+    """Read the entries of a directory by name in a single scandir pass."""
+    with os.scandir(directory) as entries:
+        return {entry.name: entry for entry in entries}
+
+
 def setup_static_file_serving(
     app: FastAPI, static_path: Path, env: str, serve_static: bool
 ) -> None:
@@ -322,40 +577,60 @@ def setup_static_file_serving(
         return
 
     logger.info(f"🎯 Serving static files from {static_path}")
+    clear_path_caches()
 
     try:
-        static_root = static_path.resolve()
+        static_root = Path(_realpath(static_path))
     except (ValueError, OSError) as e:
         logger.error(f"Failed to resolve static path: {e}")
         return
 
-    if not any(static_path.iterdir()):
+    # One directory read serves both the emptiness check and the mount point
+    # checks below
+    root_entries = _list_entries(static_path)
+    if not root_entries:
         logger.info("  ⚠️  Static directory exists but is empty")
         return
 
-    # Mount _app directory
-    app_dir = static_path / "_app"
-    if app_dir.exists() and validate_directory_safety(app_dir, static_root):
-        app.mount(
-            "/_app",
-            StaticFiles(directory=app_dir, check_dir=True, follow_symlink=False),
-            name="static_app",
-        )
-        logger.info("  ✓ Mounted /_app directory")
-    elif app_dir.exists():
-        logger.error(f"Unsafe _app directory detected, not mounting: {app_dir}")
-
-    # Mount assets directory
-    assets_dir = static_path / "assets"
-    if assets_dir.exists() and validate_directory_safety(assets_dir, static_root):
-        app.mount(
-            "/assets",
-            StaticFiles(directory=assets_dir, check_dir=True, follow_symlink=False),
-            name="assets",
+    # The static root never moves while the app runs, so its canonical form
+    # is kept for the per-request containment checks
+    static_root_resolved = app.state.static_root_resolved = str(static_root)
+
+    # Production builds are frozen at deploy time, so the directory is indexed
+    # once; development probes the filesystem so rebuilt files are picked up
+    if env == "production":
+        app.state.static_manifest = build_static_manifest(static_root)
+        lookup = functools.partial(find_file_in_manifest, app.state.static_manifest)
+        static_variants = build_precompressed_variants(
+            static_root, app.state.static_manifest
         )
-        logger.info("  ✓ Mounted /assets directory")
-    elif assets_dir.exists():
-        logger.error(f"Unsafe assets directory detected, not mounting: {assets_dir}")
+    else:
+        lookup = find_file_to_serve
+        static_variants = {}
+
+    # Mount the build output directories. The entry type refuses symlinked
+    # (or non-directory) mount points before anything is resolved.
+    for dir_name, route_name, hashed in _MOUNTED_DIRECTORIES:
+        entry = root_entries.get(dir_name)
+        if entry is None:
+            continue
+        directory = static_path / dir_name
+        if entry.is_dir(follow_symlinks=False) and validate_directory_safety(
+            directory, static_root
+        ):
+            static_files_class = BuildStaticFiles if hashed else StaticFiles
+            app.mount(
+                f"/{dir_name}",
+                static_files_class(
+                    directory=directory, check_dir=True, follow_symlink=False
+                ),
+                name=route_name,
+            )
+            logger.info(f"  ✓ Mounted /{dir_name} directory")
+        else:
+            logger.error(
+                f"Unsafe {dir_name} directory detected, not mounting: {directory}"
+            )
 
     @app.get("/{full_path:path}")
     async def serve_spa(full_path: str, request: Request):
@@ -379,15 +654,14 @@ def setup_static_file_serving(
             raise HTTPException(status_code=404, detail="Not found")
 
         # Find appropriate file
-        file_to_serve = find_file_to_serve(static_root, validated_path)
+        file_to_serve = lookup(static_root, validated_path)
 
         if file_to_serve and file_to_serve.is_file():
             try:
                 # Final TOCTOU validation
-                file_resolved = file_to_serve.resolve()
-                base_resolved = static_root.resolve()
+                file_resolved = _realpath(file_to_serve)
 
-                if not file_resolved.is_relative_to(base_resolved):
+                if not _is_within(file_resolved, static_root_resolved):
                     logger.warning(
                         "TOCTOU validation failed - potential race condition"
                     )
@@ -404,6 +678,27 @@ def setup_static_file_serving(
                 if not validate_file_size(file_to_serve):
                     raise HTTPException(status_code=404, detail="Not found")
 
+                # Serve a pre-compressed build variant when the client accepts
+                # one, keeping the media type of the original file
+                variants = static_variants.get(file_to_serve)
+                if variants:
+                    headers = {"Vary": "Accept-Encoding"}
+                    selected = select_precompressed(
+                        variants, request.headers.get("accept-encoding", "")
+                    )
+                    if selected is not None and _is_within(
+                        _realpath(selected[1]), static_root_resolved
+                    ):
+                        encoding, variant = selected
+                        headers["Content-Encoding"] = encoding
+                        media_type = mimetypes.guess_type(file_to_serve.name)[0]
+                        return FileResponse(
+                            variant,
+                            media_type=media_type or "text/plain",
+                            headers=headers,
+                        )
+                    return FileResponse(file_to_serve, headers=headers)
+
                 # Use file descriptor for better TOCTOU protection
                 return FileResponse(file_to_serve)
 
@@ -1,8 +1,8 @@
 import asyncio
-import base64
-import json
+import binascii
 import logging
 from datetime import UTC, datetime
+from typing import Any
 
 import httpx
 import redis
@@ -17,12 +17,19 @@ from priotag.models.cookie import (
     COOKIE_SECURE,
 )
 from priotag.models.pocketbase_schemas import UsersResponse
-from priotag.services.pocketbase_service import POCKETBASE_URL
+from priotag.services.pocketbase_service import (
+    POCKETBASE_URL,
+    get_pocketbase_client,
+)
 from priotag.services.redis_service import get_redis
 
+logger = logging.getLogger(__name__)
+
 # Cookie names
 # Update lastSeen at most once per hour to avoid excessive database writes
 LAST_SEEN_UPDATE_INTERVAL = 3600  # 1 hour in seconds
+# Remember tokens PocketBase rejected, so retries do not hit it again
+INVALID_TOKEN_TTL = 60  # seconds
 
 
 async def get_current_token(
@@ -47,7 +54,9 @@ async def get_current_dek(
             detail="Verschlüsselungsschlüssel nicht gefunden",
         )
     try:
-        return base64.b64decode(dek)
+        # The binascii primitive behind base64.b64decode; a non-ASCII cookie
+        # raises UnicodeEncodeError, a ValueError like b64decode's
+        return binascii.a2b_base64(dek.encode("ascii"))
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -66,50 +75,50 @@ async def verify_token(
     First checks Redis cache, then validates with PocketBase if needed.
     If PocketBase returns a new token, updates the cookie.
     """
-    logger = logging.getLogger(__name__)
-
-    # Check if token is blacklisted (logged out)
+    # Read the logout blacklist entry, the rejected-token marker and the cached
+    # session in one round trip
     blacklist_key = f"blacklist:{token}"
-    try:
-        is_blacklisted = redis_client.exists(blacklist_key)
-        if is_blacklisted:
-            logger.debug(f"Token is blacklisted: {token[:10]}...")
-            raise HTTPException(
-                status_code=401,
-                detail="Token wurde durch Logout ungültig gemacht",
-            )
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.warning(f"Failed to check blacklist: {e}")
-        # Continue if blacklist check fails (don't block valid users)
-
+    invalid_key = f"invalid:{token}"
     session_key = f"session:{token}"
 
     try:
-        cached_session = redis_client.get(session_key)
+        is_blacklisted, is_invalid, cached_session = redis_client.mget(
+            blacklist_key, invalid_key, session_key
+        )
         logger.debug(
-            f"Redis lookup for {session_key}: {'found' if cached_session else 'not found'}"
+            "Redis lookup for %s: %s",
+            session_key,
+            "found" if cached_session else "not found",
         )
     except Exception as e:
         logger.error(f"Redis connection error: {e}")
         track_session_lookup("error")
-        # If Redis fails, try PocketBase refresh
-        cached_session = None
+        # If Redis fails, try PocketBase refresh (don't block valid users)
+        is_blacklisted = is_invalid = cached_session = None
+
+    if is_blacklisted:
+        logger.debug("Token is blacklisted: %.10s...", token)
+        raise HTTPException(
+            status_code=401,
+            detail="Token wurde durch Logout ungültig gemacht",
+        )
+
+    if is_invalid:
+        logger.debug("Token was recently rejected: %.10s...", token)
+        raise HTTPException(
+            status_code=401,
+            detail="Ungültiger oder abgelaufener Token",
+        )
 
     if cached_session:
         # Session found in cache - it's valid
         track_session_lookup("cache_hit")
         try:
-            session_data = (
-                json.loads(cached_session)
-                if isinstance(cached_session, str)
-                else json.loads(str(cached_session))
-            )
-            session_info = SessionInfo(**session_data)
+            # Parse and validate in one pass, without an intermediate dict
+            session_info = SessionInfo.model_validate_json(cached_session)
 
             # Update lastSeen in background (non-blocking)
-            asyncio.create_task(update_last_seen(session_info.id, token, redis_client))
+            schedule_last_seen_update(session_info.id, token, redis_client)
 
             return session_info
         except Exception as e:
@@ -120,100 +129,100 @@ async def verify_token(
     track_session_lookup("cache_miss")
     # Session not in cache - verify with PocketBase
     logger.debug(
-        f"Session not in cache, refreshing with PocketBase for token: {token[:10]}..."
+        "Session not in cache, refreshing with PocketBase for token: %.10s...", token
     )
 
-    async with httpx.AsyncClient() as client:
-        try:
-            pb_response = await client.post(
-                f"{POCKETBASE_URL}/api/collections/users/auth-refresh",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=10.0,  # Add timeout
-            )
-
-            if pb_response.status_code != 200:
-                logger.warning(
-                    f"PocketBase auth refresh failed: {pb_response.status_code}"
-                )
-                raise HTTPException(
-                    status_code=401,
-                    detail="Ungültiger oder abgelaufener Token",
-                )
+    client = get_pocketbase_client()
+    try:
+        pb_response = await client.post(
+            f"{POCKETBASE_URL}/api/collections/users/auth-refresh",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=10.0,  # Add timeout
+        )
 
-            auth_data = pb_response.json()
-            new_token = auth_data["token"]
-            user_data = UsersResponse(**auth_data["record"])
-
-            # Extract session info
-            session_info = extract_session_info_from_record(user_data)
-            is_admin = session_info.is_admin
-
-            # Determine TTL and cookie max_age
-            if is_admin:
-                ttl = 900  # 15 minutes
-                cookie_max_age = 900
-            else:
-                # Default to "session" mode when restoring (safer)
-                ttl = 8 * 3600  # 8 hours
-                cookie_max_age = 8 * 3600
-
-            # If token was refreshed, update cookie and Redis with new token
-            if new_token != token:
-                logger.info("Token refreshed, updating Redis and cookies")
-                # Delete old session
+        if pb_response.status_code != 200:
+            logger.warning(f"PocketBase auth refresh failed: {pb_response.status_code}")
+            if pb_response.status_code == 401:
                 try:
-                    redis_client.delete(session_key)
+                    redis_client.setex(invalid_key, INVALID_TOKEN_TTL, "1")
                 except Exception as e:
-                    logger.warning(f"Failed to delete old session from Redis: {e}")
+                    logger.warning(f"Failed to cache rejected token in Redis: {e}")
+            raise HTTPException(
+                status_code=401,
+                detail="Ungültiger oder abgelaufener Token",
+            )
 
-                # Store new session with new token
-                new_session_key = f"session:{new_token}"
-                try:
-                    redis_client.setex(
-                        new_session_key,
-                        ttl,
-                        session_info.model_dump_json(),
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to store new session in Redis: {e}")
-                    # Continue anyway - PocketBase token is valid
-
-                # Update cookie with new token
-                response.set_cookie(
-                    key=COOKIE_AUTH_TOKEN,
-                    value=new_token,
-                    max_age=cookie_max_age,
-                    httponly=True,
-                    secure=COOKIE_SECURE,
-                    samesite="strict",
-                    path=COOKIE_PATH,
+        auth_data = pb_response.json()
+        new_token = auth_data["token"]
+
+        # Extract session info
+        session_info = extract_session_info_from_record(auth_data["record"])
+        is_admin = session_info.is_admin
+
+        # Determine TTL and cookie max_age
+        if is_admin:
+            ttl = 900  # 15 minutes
+            cookie_max_age = 900
+        else:
+            # Default to "session" mode when restoring (safer)
+            ttl = 8 * 3600  # 8 hours
+            cookie_max_age = 8 * 3600
+
+        # If token was refreshed, update cookie and Redis with new token
+        if new_token != token:
+            logger.info("Token refreshed, updating Redis and cookies")
+            # Delete old session
+            try:
+                redis_client.delete(session_key)
+            except Exception as e:
+                logger.warning(f"Failed to delete old session from Redis: {e}")
+
+            # Store new session with new token
+            new_session_key = f"session:{new_token}"
+            try:
+                redis_client.setex(
+                    new_session_key,
+                    ttl,
+                    session_info.model_dump_json(),
                 )
-            else:
-                # Same token, just restore to Redis
-                logger.debug("Restoring session to Redis cache")
-                try:
-                    redis_client.setex(
-                        session_key,
-                        ttl,
-                        session_info.model_dump_json(),
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to restore session to Redis: {e}")
-                    # Continue anyway - PocketBase token is valid
-
-            # Update lastSeen in background (non-blocking)
-            asyncio.create_task(
-                update_last_seen(session_info.id, new_token, redis_client)
+            except Exception as e:
+                logger.error(f"Failed to store new session in Redis: {e}")
+                # Continue anyway - PocketBase token is valid
+
+            # Update cookie with new token
+            response.set_cookie(
+                key=COOKIE_AUTH_TOKEN,
+                value=new_token,
+                max_age=cookie_max_age,
+                httponly=True,
+                secure=COOKIE_SECURE,
+                samesite="strict",
+                path=COOKIE_PATH,
             )
+        else:
+            # Same token, just restore to Redis
+            logger.debug("Restoring session to Redis cache")
+            try:
+                redis_client.setex(
+                    session_key,
+                    ttl,
+                    session_info.model_dump_json(),
+                )
+            except Exception as e:
+                logger.error(f"Failed to restore session to Redis: {e}")
+                # Continue anyway - PocketBase token is valid
 
-            return session_info
+        # Update lastSeen in background (non-blocking)
+        schedule_last_seen_update(session_info.id, new_token, redis_client)
 
-        except httpx.RequestError as e:
-            logger.error(f"PocketBase connection error: {e}")
-            raise HTTPException(
-                status_code=503,
-                detail="Authentifizierungsserver nicht erreichbar",
-            ) from e
+        return session_info
+
+    except httpx.RequestError as e:
+        logger.error(f"PocketBase connection error: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Authentifizierungsserver nicht erreichbar",
+        ) from e
 
 
 async def require_admin(
@@ -228,10 +237,22 @@ async def require_admin(
     return session
 
 
-def extract_session_info_from_record(record: UsersResponse) -> SessionInfo:
+def extract_session_info_from_record(
+    record: UsersResponse | dict[str, Any],
+) -> SessionInfo:
     """Extract session info from PocketBase user record."""
+    if isinstance(record, dict):
+        # Raw record JSON: validate only the fields the session needs instead
+        # of the full UsersResponse
+        return SessionInfo(
+            id=record["id"],
+            username=record["username"],
+            is_admin=record.get("role") == "admin",
+        )
+
     is_admin = record.role == "admin"
-    return SessionInfo(
+    # The record is an already validated UsersResponse, so skip re-validation
+    return SessionInfo.model_construct(
         id=record.id,
         username=record.username,
         is_admin=is_admin,
@@ -243,7 +264,7 @@ def get_client_ip(request: Request) -> str:
     # Check for X-Forwarded-For header (when behind proxy)
     forwarded = request.headers.get("X-Forwarded-For")
     if forwarded:
-        return forwarded.split(",")[0].strip()
+        return forwarded.split(",", 1)[0].strip()
 
     # Check for X-Real-IP header
     real_ip = request.headers.get("X-Real-IP")
@@ -254,6 +275,22 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "127.0.0.1"
 
 
+# The event loop only keeps weak references to tasks, so in-flight lastSeen
+# updates are held here until they finish
+_last_seen_tasks: set[asyncio.Task[None]] = set()
+
+
+def schedule_last_seen_update(
+    user_id: str,
+    token: str,
+    redis_client: redis.Redis,
+) -> None:
+    """Run update_last_seen in the background without delaying the request."""
+    task = asyncio.create_task(update_last_seen(user_id, token, redis_client))
+    _last_seen_tasks.add(task)
+    task.add_done_callback(_last_seen_tasks.discard)
+
+
 async def update_last_seen(
     user_id: str,
     token: str,
@@ -265,45 +302,48 @@ async def update_last_seen(
     Uses Redis to throttle updates to at most once per hour to avoid
     excessive database writes.
     """
-    logger = logging.getLogger(__name__)
-
-    # Check if we've updated recently
+    # Claim the hourly throttle atomically, so only one request updates
     throttle_key = f"lastseen:{user_id}"
 
     try:
-        recently_updated = redis_client.get(throttle_key)
-        if recently_updated:
+        claimed = redis_client.set(
+            throttle_key, "1", nx=True, ex=LAST_SEEN_UPDATE_INTERVAL
+        )
+        if not claimed:
             # Already updated recently, skip
             return
     except Exception as e:
-        logger.warning(f"Failed to check lastSeen throttle in Redis: {e}")
+        logger.warning(f"Failed to claim lastSeen throttle in Redis: {e}")
         # Continue anyway to attempt update
 
     # Update lastSeen in PocketBase
+    updated = False
     try:
-        async with httpx.AsyncClient() as client:
-            now = datetime.now(UTC).isoformat()
-            response = await client.patch(
-                f"{POCKETBASE_URL}/api/collections/users/records/{user_id}",
-                headers={"Authorization": f"Bearer {token}"},
-                json={"lastSeen": now},
-                timeout=5.0,
-            )
-
-            if response.status_code == 200:
-                # Set throttle for next hour
-                try:
-                    redis_client.setex(throttle_key, LAST_SEEN_UPDATE_INTERVAL, "1")
-                except Exception as e:
-                    logger.warning(f"Failed to set lastSeen throttle in Redis: {e}")
+        client = get_pocketbase_client()
+        now = datetime.now(UTC).isoformat()
+        response = await client.patch(
+            f"{POCKETBASE_URL}/api/collections/users/records/{user_id}",
+            headers={"Authorization": f"Bearer {token}"},
+            json={"lastSeen": now},
+            timeout=5.0,
+        )
 
-                logger.debug(f"Updated lastSeen for user {user_id}")
-            else:
-                logger.warning(
-                    f"Failed to update lastSeen for user {user_id}: "
-                    f"{response.status_code} - {response.text}"
-                )
+        if response.status_code == 200:
+            updated = True
+            logger.debug("Updated lastSeen for user %s", user_id)
+        else:
+            logger.warning(
+                f"Failed to update lastSeen for user {user_id}: "
+                f"{response.status_code} - {response.text}"
+            )
     except httpx.RequestError as e:
         logger.warning(f"Network error updating lastSeen for user {user_id}: {e}")
     except Exception as e:
         logger.error(f"Unexpected error updating lastSeen for user {user_id}: {e}")
+
+    if not updated:
+        # Release the throttle so a later request retries the update
+        try:
+            redis_client.delete(throttle_key)
+        except Exception as e:
+            logger.warning(f"Failed to release lastSeen throttle in Redis: {e}")
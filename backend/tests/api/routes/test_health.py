@@ -17,5 +17,13 @@ class TestHealthCheck:
         from priotag.api.routes.health import health_check
 
         result = await health_check()
-        # Returns None with 200 status (empty response body)
-        assert result is None
+        # Returns an empty 200 response directly, without a JSON body
+        assert result.status_code == 200
+        assert result.body == b""
+
+    def test_health_endpoint_over_http(self, client):
+        """Should answer on the mounted route through the full app stack."""
+        response = client.get("/api/v1/health")
+
+        assert response.status_code == 200
+        assert response.content == b""
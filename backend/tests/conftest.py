@@ -4,7 +4,7 @@ Pytest configuration and shared fixtures for PrioTag backend tests.
 
 import base64
 import os
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 import fakeredis
 import pytest
@@ -272,6 +272,30 @@ def mock_require_admin(sample_admin_session_info):
     return _mock_require_admin
 
 
+@pytest.fixture(scope="session")
+def client():
+    """
+    Session-wide TestClient for the main app.
+
+    The lifespan is entered once per session, so every test using this
+    fixture shares the same started ASGI stack instead of paying startup
+    and shutdown per test. The Redis hooks are only patched while the
+    lifespan starts and stops, so other tests still see the real ones.
+    """
+    from fastapi.testclient import TestClient
+
+    from priotag.main import app
+
+    test_client = TestClient(app)
+    with patch("priotag.main.redis_health_check", return_value=True):
+        test_client.__enter__()
+
+    yield test_client
+
+    with patch("priotag.main.close_redis"):
+        test_client.__exit__(None, None, None)
+
+
 @pytest.fixture
 def mock_httpx_client():
     """Mock httpx AsyncClient for external API calls."""
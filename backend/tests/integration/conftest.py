@@ -289,7 +289,7 @@ def reset_redis_singleton():
 
 
 @pytest.fixture(scope="function")
-def test_app(pocketbase_url: str, clean_redis: redis.Redis):
+def test_app(monkeypatch, pocketbase_url: str, clean_redis: redis.Redis):
     """
     Create a FastAPI test application with real dependencies.
 
@@ -317,12 +317,16 @@ def test_app(pocketbase_url: str, clean_redis: redis.Redis):
             return clean_redis
 
         app.dependency_overrides[get_redis] = get_test_redis
+        # The lifespan health check talks to the redis_service singleton
+        monkeypatch.setattr(
+            "priotag.main.redis_health_check", lambda: bool(clean_redis.ping())
+        )
 
-    # Create test client (this triggers lifespan startup)
+    # Enter the test client so lifespan startup and shutdown run, keeping
+    # all requests on one event loop
     # NOTE: raise_server_exceptions=False to avoid masking the actual HTTP error
-    client = TestClient(app, raise_server_exceptions=False)
-
-    yield client
+    with TestClient(app, raise_server_exceptions=False) as client:
+        yield client
 
     # Clean up dependency overrides
     if not USE_DOCKER_SERVICES:
@@ -0,0 +1,63 @@
+"""
+Tests for the shared PocketBase client.
+
+Tests cover:
+- Reuse of one client across calls
+- Closing and re-creating the client
+- A separate client per event loop
+"""
+
+import asyncio
+
+import pytest
+
+from priotag.services.pocketbase_service import (
+    close_pocketbase_client,
+    get_pocketbase_client,
+)
+
+
+@pytest.mark.unit
+class TestPocketBaseClient:
+    """Test the shared PocketBase client lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_client_is_reused(self):
+        """Should hand out the same client until it is closed."""
+        client = get_pocketbase_client()
+        try:
+            assert get_pocketbase_client() is client
+        finally:
+            await close_pocketbase_client()
+
+    @pytest.mark.asyncio
+    async def test_close_creates_new_client(self):
+        """Should close the client and create a fresh one on next use."""
+        client = get_pocketbase_client()
+        await close_pocketbase_client()
+
+        assert client.is_closed
+        new_client = get_pocketbase_client()
+        try:
+            assert new_client is not client
+        finally:
+            await close_pocketbase_client()
+
+    @pytest.mark.asyncio
+    async def test_close_without_client(self):
+        """Should do nothing when no client was created."""
+        await close_pocketbase_client()
+        await close_pocketbase_client()
+
+    def test_new_client_per_event_loop(self):
+        """Should not hand a client bound to a finished loop to a new one."""
+
+        async def current_client():
+            return get_pocketbase_client()
+
+        client = asyncio.run(current_client())
+        new_client = asyncio.run(current_client())
+        try:
+            assert new_client is not client
+        finally:
+            asyncio.run(close_pocketbase_client())
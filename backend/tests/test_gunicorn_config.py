@@ -4,12 +4,15 @@ Tests for gunicorn configuration.
 Tests cover:
 - HealthCheckFilter logging filter
 - on_starting callback
+- Worker count from the environment
 """
 
+import runpy
 from unittest.mock import Mock, patch
 
 import pytest
 
+from priotag import gunicorn_config
 from priotag.gunicorn_config import HealthCheckFilter, on_starting
 
 
@@ -117,3 +120,21 @@ class TestOnStarting:
         mock_get_logger.assert_any_call("uvicorn.access")
         # Both loggers should have filter added
         assert mock_logger.addFilter.call_count == 2
+
+
+@pytest.mark.unit
+class TestWorkers:
+    """Test the worker count setting."""
+
+    @pytest.mark.parametrize(("env", "expected"), [(None, 4), ("2", 2)])
+    def test_workers_from_web_concurrency(self, monkeypatch, env, expected):
+        """Should default to 4 workers unless WEB_CONCURRENCY is set."""
+        if env is None:
+            monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        else:
+            monkeypatch.setenv("WEB_CONCURRENCY", env)
+
+        # Run the config file in a fresh namespace, as gunicorn does
+        config = runpy.run_path(gunicorn_config.__file__)
+
+        assert config["workers"] == expected
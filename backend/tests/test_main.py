@@ -9,63 +9,100 @@ Tests cover:
 - Static file serving setup
 """
 
-from unittest.mock import AsyncMock, patch
+from unittest.mock import patch
 
 import pytest
 from fastapi import HTTPException, status
 
+CSP_PAYLOAD_SCRIPT = {
+    "violated-directive": "script-src 'self'",
+    "blocked-uri": "https://evil.com/script.js",
+}
+CSP_PAYLOAD_EMPTY_DIRECTIVE = {
+    "violated-directive": "",
+    "blocked-uri": "https://evil.com/script.js",
+}
+
+
+class _FakeRequest:
+    """Minimal stand-in for a Request that only needs an awaitable json()."""
+
+    __slots__ = ("_payload",)
+
+    def __init__(self, payload: dict):
+        self._payload = payload
+
+    async def json(self) -> dict:
+        return self._payload
+
+
+@pytest.fixture
+def redis_mocks():
+    """Patch the Redis health check and shutdown hooks used by the lifespan."""
+    with (
+        patch("priotag.main.redis_health_check", return_value=True) as health_check,
+        patch("priotag.main.close_redis") as close_redis,
+    ):
+        yield health_check, close_redis
+
 
 @pytest.mark.unit
 class TestLifespan:
     """Test application lifespan events."""
 
     @pytest.mark.asyncio
-    async def test_lifespan_startup_success(self):
+    async def test_lifespan_startup_success(self, redis_mocks):
         """Should successfully start up with Redis connection."""
         from fastapi import FastAPI
 
         from priotag.main import lifespan
 
-        app = FastAPI()
+        health_check, _ = redis_mocks
 
-        with patch("priotag.main.redis_health_check", return_value=True):
-            with patch("priotag.main.close_redis"):
-                async with lifespan(app):
-                    # Startup succeeded
-                    pass
+        async with lifespan(FastAPI()):
+            # Startup succeeded
+            pass
+
+        health_check.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_lifespan_startup_redis_failure(self):
+    async def test_lifespan_startup_redis_failure(self, redis_mocks):
         """Should raise error if Redis connection fails."""
         from fastapi import FastAPI
 
         from priotag.main import lifespan
 
-        app = FastAPI()
+        health_check, _ = redis_mocks
+        health_check.return_value = False
 
-        with patch("priotag.main.redis_health_check", return_value=False):
-            with pytest.raises(RuntimeError) as exc_info:
-                async with lifespan(app):
-                    pass
+        with pytest.raises(RuntimeError) as exc_info:
+            async with lifespan(FastAPI()):
+                pass
 
-            assert "Failed to connect to Redis" in str(exc_info.value)
+        assert "Failed to connect to Redis" in str(exc_info.value)
 
     @pytest.mark.asyncio
-    async def test_lifespan_shutdown_closes_redis(self):
+    async def test_lifespan_shutdown_closes_redis(self, redis_mocks):
         """Should close Redis connections on shutdown."""
         from fastapi import FastAPI
 
         from priotag.main import lifespan
 
-        app = FastAPI()
+        _, close_redis = redis_mocks
+
+        async with lifespan(FastAPI()):
+            pass
 
-        with patch("priotag.main.redis_health_check", return_value=True):
-            with patch("priotag.main.close_redis") as mock_close:
-                async with lifespan(app):
-                    pass
+        # Should have called close_redis on shutdown
+        close_redis.assert_called_once()
+
+    def test_session_client_restores_lifespan_hooks(self, client):
+        """Should leave the real Redis hooks in place once the app started."""
+        from priotag import main
+        from priotag.services.redis_service import close_redis, redis_health_check
 
-                # Should have called close_redis on shutdown
-                mock_close.assert_called_once()
+        assert main.redis_health_check is redis_health_check
+        assert main.close_redis is close_redis
 
 
 @pytest.mark.unit
@@ -77,15 +114,9 @@ class TestCSPViolationReport:
         """Should log and track CSP violations."""
         from priotag.main import csp_violation_report
 
-        mock_request = AsyncMock()
-        mock_request.json.return_value = {
-            "violated-directive": "script-src 'self'",
-            "blocked-uri": "https://evil.com/script.js",
-        }
-
         with patch("priotag.main.track_csp_violation") as mock_track:
             with patch("priotag.main.logger") as mock_logger:
-                result = await csp_violation_report(mock_request)
+                result = await csp_violation_report(_FakeRequest(CSP_PAYLOAD_SCRIPT))
 
                 assert result == {"status": "ok"}
                 mock_track.assert_called_once_with("script-src")
@@ -96,14 +127,10 @@ class TestCSPViolationReport:
         """Should handle violations with unknown directive."""
         from priotag.main import csp_violation_report
 
-        mock_request = AsyncMock()
-        mock_request.json.return_value = {
-            "violated-directive": "",
-            "blocked-uri": "https://evil.com/script.js",
-        }
-
         with patch("priotag.main.track_csp_violation") as mock_track:
-            result = await csp_violation_report(mock_request)
+            result = await csp_violation_report(
+                _FakeRequest(CSP_PAYLOAD_EMPTY_DIRECTIVE)
+            )
 
             assert result == {"status": "ok"}
             # Should not call track_csp_violation with empty directive
@@ -111,55 +138,118 @@ class TestCSPViolationReport:
             mock_track.assert_not_called()
 
 
+@pytest.fixture
+def metrics_token_override():
+    """Install a known metrics token via dependency override."""
+    from priotag.main import app, get_metrics_token
+
+    app.dependency_overrides[get_metrics_token] = lambda: "secret_token"
+    yield
+    app.dependency_overrides.pop(get_metrics_token, None)
+
+
 @pytest.mark.unit
 class TestMetricsEndpoint:
     """Test Prometheus metrics endpoint."""
 
-    @pytest.mark.asyncio
-    async def test_metrics_endpoint_valid_token(self):
+    def test_metrics_endpoint_valid_token(self, client, metrics_token_override):
         """Should return metrics with valid token."""
-        from fastapi.security import HTTPAuthorizationCredentials
+        response = client.get(
+            "/api/v1/metrics", headers={"Authorization": "Bearer secret_token"}
+        )
 
-        from priotag import main
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain")
 
-        # Patch the METRICS_TOKEN constant - use create=True since it may not exist
-        with patch.object(main, "METRICS_TOKEN", "secret_token", create=True):
-            credentials = HTTPAuthorizationCredentials(
-                scheme="Bearer", credentials="secret_token"
-            )
+    def test_metrics_endpoint_invalid_token(self, client, metrics_token_override):
+        """Should reject requests with invalid token."""
+        response = client.get(
+            "/api/v1/metrics", headers={"Authorization": "Bearer wrong_token"}
+        )
 
-            with patch("priotag.main.metrics_endpoint", return_value="metrics_data"):
-                result = await main.metrics(credentials)
-                assert result == "metrics_data"
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "Invalid metrics token" in response.json()["detail"]
 
     @pytest.mark.asyncio
-    async def test_metrics_endpoint_invalid_token(self):
-        """Should reject requests with invalid token."""
+    async def test_metrics_token_missing(self):
+        """Should reject every request when no metrics token is configured."""
         from fastapi.security import HTTPAuthorizationCredentials
 
         from priotag import main
 
-        # Patch the METRICS_TOKEN constant - use create=True since it may not exist
-        with patch.object(main, "METRICS_TOKEN", "secret_token", create=True):
-            credentials = HTTPAuthorizationCredentials(
-                scheme="Bearer", credentials="wrong_token"
-            )
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials="any_token"
+        )
 
-            with pytest.raises(HTTPException) as exc_info:
-                await main.metrics(credentials)
+        with pytest.raises(HTTPException) as exc_info:
+            await main.metrics(credentials, expected_token=None)
 
-            assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
-            assert "Invalid metrics token" in exc_info.value.detail
+        assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
 
-    def test_metrics_token_file_missing(self):
-        """Should handle missing metrics token file gracefully."""
-        from priotag import main
 
-        # The module loads at import time and logs a warning if file is missing
-        # We can verify the metrics endpoint still gets created but won't work
-        # without a token. This is tested by checking the app has the endpoint.
-        assert hasattr(main, "metrics")
-        assert callable(main.metrics)
+@pytest.mark.unit
+class TestCORSConfiguration:
+    """Test environment-dependent CORS middleware setup."""
+
+    @pytest.mark.parametrize(
+        "env,cors_origins,expected_origins",
+        [
+            (
+                "development",
+                "",
+                [
+                    "http://localhost:5173",
+                    "http://localhost:5174",
+                    "http://127.0.0.1:5173",
+                ],
+            ),
+            (
+                "production",
+                "https://a.com, https://b.com",
+                ["https://a.com", "https://b.com"],
+            ),
+            ("production", "", None),
+        ],
+        ids=["development", "production_origins", "production_no_origins"],
+    )
+    def test_cors_middleware(self, env, cors_origins, expected_origins):
+        """Should only add CORSMiddleware when there are origins to allow."""
+        from fastapi.middleware.cors import CORSMiddleware
+
+        from priotag.main import create_app
+
+        app = create_app(env=env, cors_origins=cors_origins, serve_static=False)
+
+        cors = [m for m in app.user_middleware if m.cls is CORSMiddleware]
+        if expected_origins is None:
+            assert cors == []
+        else:
+            assert len(cors) == 1
+            assert cors[0].kwargs["allow_origins"] == expected_origins
+
+    def test_cors_preflight_allows_used_methods_and_headers(self):
+        """Should answer preflights with the explicit lists and a cache age."""
+        from fastapi.testclient import TestClient
+
+        from priotag.main import create_app
+
+        app = create_app(
+            env="production", cors_origins="https://a.com", serve_static=False
+        )
+
+        response = TestClient(app).options(
+            "/api/v1/health",
+            headers={
+                "Origin": "https://a.com",
+                "Access-Control-Request-Method": "PATCH",
+                "Access-Control-Request-Headers": "content-type",
+            },
+        )
+
+        assert response.status_code == 200
+        assert "PATCH" in response.headers["access-control-allow-methods"]
+        assert "Content-Type" in response.headers["access-control-allow-headers"]
+        assert response.headers["access-control-max-age"] == "7200"
 
 
 @pytest.mark.unit
@@ -187,14 +277,16 @@ class TestEnvironmentConfiguration:
         assert app is not None
         assert app.title == "PrioTag API"
 
-    def test_docs_configuration(self):
-        """Should configure docs based on environment."""
-        from priotag.main import app
+    def test_docs_configuration(self, client):
+        """Should only expose docs outside of production."""
+        from priotag.main import ENV, app
+
+        docs_enabled = ENV != "production"
+        assert (app.docs_url is not None) == docs_enabled
+        assert (app.redoc_url is not None) == docs_enabled
 
-        # Docs URL is set based on ENV variable
-        # In test environment it should be set (not production)
-        assert app.docs_url is not None or app.docs_url is None
-        # Just verify it's configured without errors
+        response = client.get("/api/docs")
+        assert (response.status_code == 200) == docs_enabled
 
     def test_routers_included(self):
         """Should include all API routers."""
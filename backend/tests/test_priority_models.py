@@ -20,109 +20,94 @@ from priotag.models.priorities import (
     validate_weeks_not_started,
 )
 
+# Read-only valid instances shared across tests, built once at import
+WEEK_FULL = WeekPriority(
+    weekNumber=1,
+    monday=1,
+    tuesday=2,
+    wednesday=3,
+    thursday=4,
+    friday=5,
+)
+WEEKS_BY_NUMBER = {n: WeekPriority(weekNumber=n, monday=1) for n in (1, 2, 3, 5)}
 
-@pytest.mark.unit
-class TestValidateWeeksNotStarted:
-    """Test validate_weeks_not_started function."""
-
-    def test_future_weeks_pass_validation(self):
-        """Should pass validation for weeks that haven't started yet."""
-        # Get a future month (next month)
-        future_month = (datetime.now() + timedelta(days=32)).strftime("%Y-%m")
+# A Wednesday in the third week of January, so week 1 has already started
+FROZEN_NOW = datetime(2025, 1, 15, 12, 0)
+CURRENT_MONTH = f"{FROZEN_NOW.year:04d}-{FROZEN_NOW.month:02d}"
+NEXT_MONTH = (FROZEN_NOW + timedelta(days=32)).strftime("%Y-%m")
+PAST_MONTH = (FROZEN_NOW - timedelta(days=32)).strftime("%Y-%m")
+FAR_FUTURE_MONTH = (FROZEN_NOW + timedelta(days=120)).strftime("%Y-%m")
 
-        weeks = [
-            WeekPriority(weekNumber=1, monday=1),
-            WeekPriority(weekNumber=2, tuesday=2),
-            WeekPriority(weekNumber=3, wednesday=3),
-        ]
 
-        # Should not raise an exception
-        validate_weeks_not_started(future_month, weeks)
+class _FrozenDatetime(datetime):
+    """datetime whose now() is pinned to FROZEN_NOW."""
 
-    def test_started_week_fails_validation(self):
-        """Should raise ValueError for weeks that have already started."""
-        # Get current month
-        current_month = datetime.now().strftime("%Y-%m")
-        now = datetime.now()
+    @classmethod
+    def now(cls, tz=None):
+        return FROZEN_NOW
 
-        # Create a week that should have started (week 1 of current month)
-        # This test assumes we're not in the first week of the month
-        # If we are, we need to handle it differently
 
-        # Calculate which week of the current month we're in
-        first_day = datetime(now.year, now.month, 1)
-        day_of_week = first_day.weekday()
-        first_week_monday = first_day - timedelta(days=day_of_week)
+@pytest.fixture
+def frozen_now(monkeypatch):
+    """Pin datetime.now() inside the priorities models module."""
+    monkeypatch.setattr("priotag.models.priorities.datetime", _FrozenDatetime)
 
-        # Calculate the current week number
-        days_since_first_monday = (now - first_week_monday).days
-        current_week_number = (days_since_first_monday // 7) + 1
 
-        # If we're in week 1 or later, test with week 1
-        if current_week_number >= 1:
-            weeks = [WeekPriority(weekNumber=1, monday=1)]
+@pytest.mark.unit
+@pytest.mark.usefixtures("frozen_now")
+class TestValidateWeeksNotStarted:
+    """Test validate_weeks_not_started function."""
 
+    @pytest.mark.parametrize(
+        "month,week_numbers,should_raise",
+        [
+            (NEXT_MONTH, [1, 2, 3], False),
+            (CURRENT_MONTH, [1], True),
+            (CURRENT_MONTH, [1, 5], True),
+            (CURRENT_MONTH, [], False),
+        ],
+        ids=["future_weeks", "started_week", "mixed_weeks", "empty_weeks"],
+    )
+    def test_validate_weeks_not_started(self, month, week_numbers, should_raise):
+        """Should raise ValueError only if any of the weeks has already started."""
+        weeks = [WEEKS_BY_NUMBER[n] for n in week_numbers]
+
+        if should_raise:
             with pytest.raises(ValueError) as exc_info:
-                validate_weeks_not_started(current_month, weeks)
+                validate_weeks_not_started(month, weeks)
 
             assert "hat bereits begonnen" in str(exc_info.value)
             assert "Woche 1" in str(exc_info.value)
-
-    def test_mixed_weeks_fails_validation(self):
-        """Should raise ValueError if any week has started, even if others haven't."""
-        current_month = datetime.now().strftime("%Y-%m")
-
-        # Mix of started week (1) and future weeks
-        weeks = [
-            WeekPriority(weekNumber=1, monday=1),
-            WeekPriority(weekNumber=5, tuesday=2),  # Likely future week
-        ]
-
-        # Should fail because week 1 has likely started
-        with pytest.raises(ValueError) as exc_info:
-            validate_weeks_not_started(current_month, weeks)
-
-        assert "hat bereits begonnen" in str(exc_info.value)
-
-    def test_empty_weeks_pass_validation(self):
-        """Should pass validation for empty weeks list."""
-        current_month = datetime.now().strftime("%Y-%m")
-
-        # Should not raise an exception
-        validate_weeks_not_started(current_month, [])
+        else:
+            validate_weeks_not_started(month, weeks)
 
 
 @pytest.mark.unit
+@pytest.mark.usefixtures("frozen_now")
 class TestValidateMonthFormatAndRange:
     """Test validate_month_format_and_range function."""
 
     def test_current_month_passes(self):
         """Should pass validation for current month."""
-        current_month = datetime.now().strftime("%Y-%m")
-        result = validate_month_format_and_range(current_month)
-        assert result == current_month
+        result = validate_month_format_and_range(CURRENT_MONTH)
+        assert result == CURRENT_MONTH
 
     def test_future_month_within_range_passes(self):
         """Should pass validation for month within allowed range."""
-        future_month = (datetime.now() + timedelta(days=32)).strftime("%Y-%m")
-        result = validate_month_format_and_range(future_month)
-        assert result == future_month
+        result = validate_month_format_and_range(NEXT_MONTH)
+        assert result == NEXT_MONTH
 
     def test_past_month_fails(self):
         """Should raise ValueError for past months."""
-        past_month = (datetime.now() - timedelta(days=32)).strftime("%Y-%m")
-
         with pytest.raises(ValueError) as exc_info:
-            validate_month_format_and_range(past_month)
+            validate_month_format_and_range(PAST_MONTH)
 
         assert "Month must be between" in str(exc_info.value)
 
     def test_far_future_month_fails(self):
         """Should raise ValueError for months too far in the future."""
-        far_future = (datetime.now() + timedelta(days=120)).strftime("%Y-%m")
-
         with pytest.raises(ValueError) as exc_info:
-            validate_month_format_and_range(far_future)
+            validate_month_format_and_range(FAR_FUTURE_MONTH)
 
         assert "Month must be between" in str(exc_info.value)
 
@@ -142,45 +127,22 @@ class TestValidateMonthFormatAndRange:
 class TestGetWeekStartDate:
     """Test get_week_start_date function."""
 
-    def test_first_week_of_month_starting_monday(self):
-        """Should calculate correct Monday for month starting on Monday."""
-        # January 2024 starts on a Monday
-        result = get_week_start_date(2024, 1, 1)
-
-        # First week should start on Jan 1, 2024 (Monday)
-        assert result == datetime(2024, 1, 1)
-        assert result.weekday() == 0  # Monday
-
-    def test_first_week_of_month_not_starting_monday(self):
-        """Should calculate Monday in previous month if needed."""
-        # January 2025 starts on a Wednesday
-        result = get_week_start_date(2025, 1, 1)
-
-        # First week's Monday should be Dec 30, 2024
-        assert result == datetime(2024, 12, 30)
-        assert result.weekday() == 0  # Monday
-
-    def test_subsequent_weeks(self):
-        """Should calculate correct dates for subsequent weeks."""
-        # Get first week
-        week1 = get_week_start_date(2025, 1, 1)
-
-        # Week 2 should be 7 days later
-        week2 = get_week_start_date(2025, 1, 2)
-        assert week2 == week1 + timedelta(days=7)
-        assert week2.weekday() == 0
-
-        # Week 3 should be 14 days after week 1
-        week3 = get_week_start_date(2025, 1, 3)
-        assert week3 == week1 + timedelta(days=14)
-        assert week3.weekday() == 0
-
-    def test_week_5(self):
-        """Should calculate correct date for week 5."""
-        week5 = get_week_start_date(2025, 1, 5)
-
-        # Should still be a Monday
-        assert week5.weekday() == 0
+    @pytest.mark.parametrize(
+        "year,month,week_number,expected",
+        [
+            # January 2024 starts on a Monday
+            (2024, 1, 1, datetime(2024, 1, 1)),
+            # January 2025 starts on a Wednesday, so week 1 begins in December
+            (2025, 1, 1, datetime(2024, 12, 30)),
+            (2025, 1, 2, datetime(2025, 1, 6)),
+            (2025, 1, 3, datetime(2025, 1, 13)),
+            (2025, 1, 5, datetime(2025, 1, 27)),
+        ],
+    )
+    def test_week_start_date(self, year, month, week_number, expected):
+        """Should return the Monday starting the requested week."""
+        assert get_week_start_date(year, month, week_number) == expected
+        assert expected.weekday() == 0  # Monday
 
 
 @pytest.mark.unit
@@ -189,18 +151,10 @@ class TestWeekPriorityModel:
 
     def test_valid_week_priority(self):
         """Should create valid WeekPriority with valid data."""
-        week = WeekPriority(
-            weekNumber=1,
-            monday=1,
-            tuesday=2,
-            wednesday=3,
-            thursday=4,
-            friday=5,
-        )
-
-        assert week.weekNumber == 1
-        assert week.monday == 1
-        assert week.tuesday == 2
+        assert WEEK_FULL.weekNumber == 1
+        assert WEEK_FULL.monday == 1
+        assert WEEK_FULL.tuesday == 2
+        assert WEEK_FULL.friday == 5
 
     def test_week_number_validation(self):
         """Should validate week number range."""
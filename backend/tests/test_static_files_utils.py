@@ -10,19 +10,27 @@ Tests cover:
 - Security protections against path traversal
 """
 
-import tempfile
+import gzip
+import os
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 from fastapi import FastAPI
+from fastapi.testclient import TestClient
 
 from priotag.static_files_utils import (
+    _safe_join_cached,
+    build_precompressed_variants,
+    build_static_manifest,
+    clear_path_caches,
+    find_file_in_manifest,
     find_file_to_serve,
     is_allowed_file,
     is_safe_symlink,
     normalize_unicode,
     safe_join_path,
+    select_precompressed,
     setup_static_file_serving,
     validate_directory_safety,
     validate_file_size,
@@ -30,6 +38,44 @@ from priotag.static_files_utils import (
 )
 
 
+@pytest.fixture(scope="module")
+def shared_static(tmp_path_factory):
+    """
+    Static root shared by the tests of this module.
+
+    Created once with a root index.html; tests only add uniquely named
+    entries so they never depend on each other.
+    """
+    static_root = tmp_path_factory.mktemp("static")
+    (static_root / "index.html").write_text("<html></html>")
+    return static_root
+
+
+@pytest.fixture
+def app():
+    """A fresh FastAPI app for static file serving setup tests."""
+    return FastAPI()
+
+
+@pytest.fixture(autouse=True)
+def reset_path_caches():
+    """Make sure memoized lookups never leak between tests."""
+    clear_path_caches()
+    yield
+    clear_path_caches()
+
+
+def failing_realpath(exc_type: type[Exception], name: str | None = None):
+    """Build a _realpath stand-in raising exc_type, optionally for one file name."""
+
+    def realpath(path: Path | str) -> str:
+        if name is None or os.path.basename(path) == name:
+            raise exc_type("resolve error")
+        return os.path.realpath(path)
+
+    return realpath
+
+
 @pytest.mark.unit
 class TestNormalizeUnicode:
     """Test Unicode normalization."""
@@ -53,78 +99,64 @@ class TestNormalizeUnicode:
 
         assert result == text
 
+    def test_normalize_unicode_fast_path_no_copy(self):
+        """Should return ASCII input as the very same object."""
+        text = "".join(["hello", "_world.html"])  # not interned
+
+        assert normalize_unicode(text) is text
+
+    def test_normalize_unicode_compatibility_chars(self):
+        """Should still fold non-ASCII compatibility characters."""
+        assert normalize_unicode("ﬁle.html") == "file.html"
+
 
 @pytest.mark.unit
 class TestValidatePathComponent:
     """Test path component validation."""
 
-    def test_valid_component(self):
-        """Should accept valid path components."""
-        assert validate_path_component("index.html") == "index.html"
-        assert validate_path_component("app.js") == "app.js"
-        assert validate_path_component("style.css") == "style.css"
-
-    def test_reject_dot(self):
-        """Should reject single dot."""
-        assert validate_path_component(".") is None
-
-    def test_reject_double_dot(self):
-        """Should reject double dot."""
-        assert validate_path_component("..") is None
-
-    def test_reject_null_bytes(self):
-        """Should reject null bytes."""
-        assert validate_path_component("file\x00.txt") is None
-
-    def test_reject_path_separators(self):
-        """Should reject path separators."""
-        assert validate_path_component("file/path") is None
-        assert validate_path_component("file\\path") is None
-
-    def test_reject_url_encoded_null(self):
-        """Should reject URL-encoded null bytes."""
-        assert validate_path_component("file%00.txt") is None
-
-    def test_reject_url_encoded_separators(self):
-        """Should reject URL-encoded path separators."""
-        assert validate_path_component("file%2fpath") is None
-        assert validate_path_component("file%2Fpath") is None
-        assert validate_path_component("file%5cpath") is None
-
-    def test_reject_hidden_files(self):
-        """Should reject hidden files (starting with dot)."""
-        assert validate_path_component(".htaccess") is None
-        assert validate_path_component(".env") is None
-
-    def test_reject_tilde_files(self):
-        """Should reject files starting with tilde."""
-        assert validate_path_component("~backup") is None
-
-    def test_reject_windows_reserved_names(self):
-        """Should reject Windows reserved names."""
-        assert validate_path_component("CON") is None
-        assert validate_path_component("PRN") is None
-        assert validate_path_component("AUX") is None
-        assert validate_path_component("NUL") is None
-        assert validate_path_component("COM1") is None
-        assert validate_path_component("LPT1") is None
-
-    def test_reject_special_characters(self):
-        """Should reject special characters not in whitelist."""
-        assert validate_path_component("file<script>.html") is None
-        assert validate_path_component("file&data.txt") is None
-
-    def test_reject_consecutive_dots(self):
-        """Should reject multiple consecutive dots."""
-        assert validate_path_component("file..txt") is None
-
-    def test_lowercase_conversion(self):
-        """Should convert to lowercase."""
-        assert validate_path_component("File.HTML") == "file.html"
-
-    def test_accept_valid_chars(self):
-        """Should accept alphanumeric, hyphens, underscores, single dots."""
-        assert validate_path_component("valid-file_123.txt") == "valid-file_123.txt"
+    @pytest.mark.parametrize(
+        "raw,expected",
+        [
+            # Valid components
+            ("index.html", "index.html"),
+            ("app.js", "app.js"),
+            ("style.css", "style.css"),
+            ("valid-file_123.txt", "valid-file_123.txt"),
+            # Lowercase conversion
+            ("File.HTML", "file.html"),
+            # Dot components
+            (".", None),
+            ("..", None),
+            # Null bytes and path separators
+            ("file\x00.txt", None),
+            ("file/path", None),
+            ("file\\path", None),
+            # URL-encoded null bytes and separators
+            ("file%00.txt", None),
+            ("file%2fpath", None),
+            ("file%2Fpath", None),
+            ("file%5cpath", None),
+            # Hidden and backup files
+            (".htaccess", None),
+            (".env", None),
+            ("~backup", None),
+            # Windows reserved names
+            ("CON", None),
+            ("PRN", None),
+            ("AUX", None),
+            ("NUL", None),
+            ("COM1", None),
+            ("LPT1", None),
+            # Characters outside the whitelist
+            ("file<script>.html", None),
+            ("file&data.txt", None),
+            # Consecutive dots
+            ("file..txt", None),
+        ],
+    )
+    def test_validate_path_component(self, raw, expected):
+        """Should return the sanitized component or None if it is rejected."""
+        assert validate_path_component(raw) == expected
 
 
 @pytest.mark.unit
@@ -139,19 +171,12 @@ class TestSafeJoinPath:
         assert result is not None
         assert result == base / "app.js"
 
-    def test_safe_join_empty_returns_index(self):
-        """Should return index.html for empty path."""
-        base = Path("/static")
-        result = safe_join_path(base, "")
-
-        assert result == base / "index.html"
-
-    def test_safe_join_slash_only_returns_index(self):
-        """Should return index.html for root path."""
+    @pytest.mark.parametrize("raw", ["", "/"], ids=["empty", "slash_only"])
+    def test_safe_join_root_returns_index(self, raw):
+        """Should return index.html for the root path."""
         base = Path("/static")
-        result = safe_join_path(base, "/")
 
-        assert result == base / "index.html"
+        assert safe_join_path(base, raw) == base / "index.html"
 
     def test_safe_join_nested_path(self):
         """Should handle nested paths."""
@@ -162,313 +187,487 @@ class TestSafeJoinPath:
         assert "assets" in str(result)
         assert "styles" in str(result)
 
-    def test_safe_join_rejects_traversal(self):
-        """Should reject path traversal attempts."""
+    @pytest.mark.parametrize(
+        "raw",
+        [
+            "../../../etc/passwd",
+            "/".join(f"level{i}" for i in range(15)),
+            "valid/../../invalid",
+        ],
+        ids=["traversal", "deep_nesting", "invalid_component"],
+    )
+    def test_safe_join_rejects(self, raw):
+        """Should reject traversal, paths over max depth and invalid components."""
+        assert safe_join_path(Path("/static"), raw) is None
+
+    def test_safe_join_cache_hit(self):
+        """Should serve repeated lookups from the cache."""
         base = Path("/static")
-        result = safe_join_path(base, "../../../etc/passwd")
 
-        assert result is None
+        first = safe_join_path(base, "assets/app.js")
+        second = safe_join_path(base, "assets/app.js")
 
-    def test_safe_join_rejects_deep_nesting(self):
-        """Should reject paths exceeding max depth."""
-        base = Path("/static")
-        # Create path with > 10 components
-        deep_path = "/".join([f"level{i}" for i in range(15)])
-        result = safe_join_path(base, deep_path)
+        assert first == second
+        assert _safe_join_cached.cache_info().hits >= 1
 
-        assert result is None
-
-    def test_safe_join_validates_each_component(self):
-        """Should validate each path component."""
-        base = Path("/static")
-        result = safe_join_path(base, "valid/../../invalid")
+    @pytest.mark.parametrize(
+        "raw",
+        ["Assets/App.JS", "docs/con.txt", "a..b/c", "file.", "x/~y", "a%2fb"],
+    )
+    def test_safe_join_fast_path_matches_component_validation(self, raw):
+        """The whole-path regex should agree with per-component validation."""
+        parts = [validate_path_component(part) for part in raw.split("/")]
+        expected = None if None in parts else Path("/static", *parts)
 
-        assert result is None
+        assert safe_join_path(Path("/static"), raw) == expected
 
 
 @pytest.mark.unit
 class TestIsAllowedFile:
     """Test file extension validation."""
 
-    def test_allowed_extensions(self):
-        """Should allow whitelisted extensions."""
-        assert is_allowed_file(Path("file.html")) is True
-        assert is_allowed_file(Path("file.css")) is True
-        assert is_allowed_file(Path("file.js")) is True
-        assert is_allowed_file(Path("file.png")) is True
-        assert is_allowed_file(Path("file.json")) is True
-
-    def test_disallowed_extensions(self):
-        """Should reject non-whitelisted extensions."""
-        assert is_allowed_file(Path("file.php")) is False
-        assert is_allowed_file(Path("file.py")) is False
-        assert is_allowed_file(Path("file.sh")) is False
-        assert is_allowed_file(Path("file.exe")) is False
-
-    def test_double_extension_suspicious(self):
-        """Should reject files with suspicious double extensions."""
-        assert is_allowed_file(Path("file.php.txt")) is False
-        assert is_allowed_file(Path("file.py.html")) is False
-        assert is_allowed_file(Path("file.sh.css")) is False
-
-    def test_double_extension_safe(self):
-        """Should allow safe double extensions."""
-        assert is_allowed_file(Path("app.min.js")) is True
-        assert is_allowed_file(Path("styles.bundle.css")) is True
-
-    def test_case_insensitive(self):
-        """Should be case insensitive."""
-        assert is_allowed_file(Path("file.HTML")) is True
-        assert is_allowed_file(Path("file.PHP")) is False
+    @pytest.mark.parametrize(
+        "name,expected",
+        [
+            # Whitelisted extensions
+            ("file.html", True),
+            ("file.css", True),
+            ("file.js", True),
+            ("file.png", True),
+            ("file.json", True),
+            # Non-whitelisted extensions
+            ("file.php", False),
+            ("file.py", False),
+            ("file.sh", False),
+            ("file.exe", False),
+            # Suspicious double extensions
+            ("file.php.txt", False),
+            ("file.py.html", False),
+            ("file.sh.css", False),
+            ("file.cgi.html", False),
+            ("file.jsp.js", False),
+            ("file.min.php.js", False),
+            # Safe double extensions
+            ("app.min.js", True),
+            ("styles.bundle.css", True),
+            # Case insensitive
+            ("file.HTML", True),
+            ("file.PHP", False),
+        ],
+    )
+    def test_is_allowed_file(self, name, expected):
+        """Should only allow whitelisted, non-suspicious extensions."""
+        assert is_allowed_file(Path(name)) is expected
 
 
 @pytest.mark.unit
 class TestValidateFileSize:
     """Test file size validation."""
 
-    def test_valid_file_size(self):
+    def test_valid_file_size(self, monkeypatch):
         """Should accept files within size limit."""
-        with tempfile.NamedTemporaryFile() as tmp:
-            tmp.write(b"x" * 1000)  # 1KB
-            tmp.flush()
+        monkeypatch.setattr("priotag.static_files_utils._get_size", lambda p: 1000)
 
-            assert validate_file_size(Path(tmp.name)) is True
+        assert validate_file_size(Path("/any/file.html")) is True
 
-    def test_large_file_rejected(self):
+    def test_large_file_rejected(self, monkeypatch):
         """Should reject files exceeding 10MB limit."""
-        with tempfile.NamedTemporaryFile() as tmp:
-            # Mock st_size to be > 10MB
-            with patch("pathlib.Path.stat") as mock_stat:
-                mock_stat.return_value.st_size = 11 * 1024 * 1024
+        monkeypatch.setattr(
+            "priotag.static_files_utils._get_size", lambda p: 11 * 1024 * 1024
+        )
 
-                assert validate_file_size(Path(tmp.name)) is False
+        assert validate_file_size(Path("/any/file.html")) is False
 
     def test_nonexistent_file(self):
         """Should return False for nonexistent file."""
         assert validate_file_size(Path("/nonexistent/file.txt")) is False
 
+    def test_prefetched_stat_skips_stat_call(self):
+        """Should use a stat result passed in instead of stat-ing again."""
+        st = os.stat_result((0o100644, 0, 0, 1, 0, 0, 1000, 0, 0, 0))
+        with patch("priotag.static_files_utils._get_size") as mock_get_size:
+            assert validate_file_size(Path("/nonexistent/file.html"), st) is True
+
+        mock_get_size.assert_not_called()
+
 
 @pytest.mark.unit
 class TestIsSafeSymlink:
     """Test symlink safety validation."""
 
-    def test_regular_file_is_safe(self):
+    def test_regular_file_is_safe(self, shared_static):
         """Regular files should be considered safe."""
-        with tempfile.NamedTemporaryFile() as tmp:
-            base = Path(tmp.name).parent
-            assert is_safe_symlink(Path(tmp.name), base) is True
+        assert is_safe_symlink(shared_static / "index.html", shared_static) is True
 
-    def test_symlink_within_base_is_safe(self):
+    def test_symlink_within_base_is_safe(self, shared_static):
         """Symlinks pointing within base directory should be safe."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir)
-            target = base / "target.txt"
-            target.touch()
+        target = shared_static / "within_target.txt"
+        target.touch()
 
-            link = base / "link.txt"
-            link.symlink_to(target)
+        link = shared_static / "within_link.txt"
+        link.symlink_to(target)
 
-            assert is_safe_symlink(link, base) is True
+        assert is_safe_symlink(link, shared_static) is True
 
-    def test_symlink_outside_base_is_unsafe(self):
+    def test_symlink_outside_base_is_unsafe(self, shared_static):
         """Symlinks pointing outside base directory should be unsafe."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir) / "static"
-            base.mkdir()
+        base = shared_static / "symlink_base"
+        base.mkdir()
 
-            # Create target outside base
-            outside = Path(tmpdir) / "outside.txt"
-            outside.touch()
+        # Create target outside base
+        outside = shared_static / "symlink_outside.txt"
+        outside.touch()
 
-            link = base / "link.txt"
-            link.symlink_to(outside)
+        link = base / "link.txt"
+        link.symlink_to(outside)
 
-            assert is_safe_symlink(link, base) is False
+        assert is_safe_symlink(link, base) is False
 
 
 @pytest.mark.unit
 class TestValidateDirectorySafety:
     """Test directory safety validation."""
 
-    def test_directory_within_base_is_safe(self):
+    def test_directory_within_base_is_safe(self, shared_static):
         """Directories within base should be safe."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir)
-            subdir = base / "subdir"
-            subdir.mkdir()
+        subdir = shared_static / "safe_subdir"
+        subdir.mkdir()
 
-            assert validate_directory_safety(subdir, base) is True
+        assert validate_directory_safety(subdir, shared_static) is True
 
-    def test_directory_outside_base_is_unsafe(self):
+    def test_directory_outside_base_is_unsafe(self, shared_static):
         """Directories outside base should be unsafe."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir) / "static"
-            base.mkdir()
+        base = shared_static / "dir_base"
+        base.mkdir()
 
-            outside = Path(tmpdir) / "outside"
-            outside.mkdir()
+        outside = shared_static / "dir_outside"
+        outside.mkdir()
 
-            assert validate_directory_safety(outside, base) is False
+        assert validate_directory_safety(outside, base) is False
 
 
 @pytest.mark.unit
 class TestFindFileToServe:
     """Test file serving logic."""
 
-    def test_find_regular_file(self):
+    def test_find_regular_file(self, shared_static):
         """Should find and return regular file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir)
-            test_file = base / "test.html"
-            test_file.write_text("<html></html>")
+        test_file = shared_static / "test.html"
+        test_file.write_text("<html></html>")
 
-            result = find_file_to_serve(base, test_file)
+        result = find_file_to_serve(shared_static, test_file)
 
-            assert result == test_file
+        assert result == test_file
+
+    def test_regular_file_skips_symlink_check(self, shared_static):
+        """Should not run the symlink check for a file that is not a link."""
+        test_file = shared_static / "plain.js"
+        test_file.write_text("")
+
+        with patch("priotag.static_files_utils.is_safe_symlink") as mock_check:
+            assert find_file_to_serve(shared_static, test_file) == test_file
+
+        mock_check.assert_not_called()
+
+    def test_root_index_fallback_with_symlinked_base(self, tmp_path):
+        """Should serve the root index when the base path is a symlink."""
+        real = tmp_path / "real"
+        real.mkdir()
+        (real / "index.html").write_text("<html></html>")
+        link = tmp_path / "link"
+        link.symlink_to(real)
+        validated = safe_join_path(link, "nothing")
+
+        result = find_file_to_serve(link, validated)
+
+        assert result == real.resolve() / "index.html"
+
+    def test_plain_directory_index_is_not_resolved(self, shared_static, monkeypatch):
+        """Should serve a plain directory index.html without resolving it."""
+        subdir = shared_static / "plain_docs"
+        subdir.mkdir()
+        index = subdir / "index.html"
+        index.write_text("<html></html>")
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath",
+            failing_realpath(OSError, "index.html"),
+        )
 
-    def test_find_index_in_directory(self):
+        assert find_file_to_serve(shared_static, subdir) == index
+
+    def test_find_index_in_directory(self, shared_static):
         """Should return index.html for directory."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir)
-            subdir = base / "docs"
-            subdir.mkdir()
+        subdir = shared_static / "docs"
+        subdir.mkdir()
 
-            index = subdir / "index.html"
-            index.write_text("<html></html>")
+        index = subdir / "index.html"
+        index.write_text("<html></html>")
 
-            result = find_file_to_serve(base, subdir)
+        result = find_file_to_serve(shared_static, subdir)
 
-            assert result == index
+        assert result == index
 
-    def test_find_with_html_extension(self):
+    def test_find_with_html_extension(self, shared_static):
         """Should try .html extension."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir)
-            html_file = base / "page.html"
-            html_file.write_text("<html></html>")
+        html_file = shared_static / "page.html"
+        html_file.write_text("<html></html>")
 
-            # Request without extension
-            requested = base / "page"
+        # Request without extension
+        requested = shared_static / "page"
 
-            result = find_file_to_serve(base, requested)
+        result = find_file_to_serve(shared_static, requested)
 
-            assert result == html_file
+        assert result == html_file
 
-    def test_fallback_to_root_index(self):
+    def test_fallback_to_root_index(self, shared_static):
         """Should fallback to root index.html."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir)
-            root_index = base / "index.html"
-            root_index.write_text("<html></html>")
+        # Request nonexistent file
+        nonexistent = shared_static / "nonexistent.html"
 
-            # Request nonexistent file
-            nonexistent = base / "nonexistent.html"
+        result = find_file_to_serve(shared_static, nonexistent)
 
-            result = find_file_to_serve(base, nonexistent)
+        assert result == shared_static / "index.html"
 
-            assert result == root_index
-
-    def test_reject_disallowed_extension(self):
+    def test_reject_disallowed_extension(self, shared_static):
         """Should reject files with disallowed extensions."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir)
-            php_file = base / "shell.php"
-            php_file.write_text("<?php ?>")
+        php_file = shared_static / "shell.php"
+        php_file.write_text("<?php ?>")
 
-            result = find_file_to_serve(base, php_file)
+        result = find_file_to_serve(shared_static, php_file)
 
-            assert result is None
+        assert result is None
 
-    def test_reject_oversized_file(self):
+    def test_reject_oversized_file(self, shared_static):
         """Should reject files exceeding size limit."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            base = Path(tmpdir)
-            large_file = base / "large.html"
-            large_file.touch()
+        large_file = shared_static / "large.html"
+        large_file.touch()
 
-            with patch(
-                "priotag.static_files_utils.validate_file_size", return_value=False
-            ):
-                result = find_file_to_serve(base, large_file)
+        with patch("priotag.static_files_utils.validate_file_size", return_value=False):
+            result = find_file_to_serve(shared_static, large_file)
 
-                assert result is None
+            assert result is None
 
 
 @pytest.mark.unit
-class TestSetupStaticFileServing:
-    """Test static file serving setup."""
+class TestStaticManifest:
+    """Test the production manifest used in place of filesystem probing."""
+
+    @pytest.fixture(scope="class")
+    def site(self, tmp_path_factory):
+        root = tmp_path_factory.mktemp("site").resolve()
+        (root / "index.html").write_text("<html>root</html>")
+        (root / "app.js").write_text("console.log('app');")
+        (root / "config.php").write_text("<?php ?>")
+        (root / "about.html").write_text("<html>about</html>")
+        (root / "docs").mkdir()
+        (root / "docs" / "index.html").write_text("<html>docs</html>")
+        (root / "blog").mkdir()
+        (root / "blog.html").write_text("<html>blog</html>")
+        (root / "empty").mkdir()
+        return root
+
+    def test_manifest_marks_blocked_files(self, site):
+        """Should map servable files to paths and blocked files to None."""
+        manifest = build_static_manifest(site)
+
+        assert manifest["app.js"] == site / "app.js"
+        assert manifest[str(Path("docs", "index.html"))] == site / "docs" / "index.html"
+        assert manifest["config.php"] is None
+
+    def test_manifest_adds_extensionless_routes(self, site):
+        """Should map directory and .html-less routes to their files."""
+        manifest = build_static_manifest(site)
+
+        assert manifest["docs"] == site / "docs" / "index.html"
+        assert manifest["about"] == site / "about.html"
+        assert manifest["blog"] == site / "blog.html"
+
+    @pytest.mark.parametrize(
+        "raw",
+        [
+            "",
+            "app.js",
+            "config.php",
+            "docs",
+            "docs/index",
+            "about",
+            "blog",
+            "empty",
+            "missing",
+        ],
+    )
+    def test_manifest_lookup_matches_filesystem(self, site, raw):
+        """Should pick the same file as find_file_to_serve."""
+        manifest = build_static_manifest(site)
+        validated = safe_join_path(site, raw)
+
+        assert find_file_in_manifest(manifest, site, validated) == (
+            find_file_to_serve(site, validated)
+        )
 
-    def test_setup_in_production_with_files(self):
-        """Should setup static serving in production when files exist."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            static_path = Path(tmpdir)
-            (static_path / "index.html").write_text("<html></html>")
+    def test_manifest_skips_symlinked_directories(self, tmp_path):
+        """Should index nested files without descending into directory links."""
+        base = tmp_path / "static"
+        (base / "assets" / "js").mkdir(parents=True)
+        (base / "assets" / "js" / "app.js").write_text("")
+        (base / "linked").symlink_to(base / "assets")
 
-            app = FastAPI()
-            setup_static_file_serving(app, static_path, "production", False)
+        manifest = build_static_manifest(base)
 
-            # Should have added catch-all route
-            # (Testing internal FastAPI routing is complex, just verify no errors)
+        assert list(manifest) == [str(Path("assets", "js", "app.js"))]
 
-    def test_setup_skips_if_no_files(self):
-        """Should skip setup if directory is empty."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            static_path = Path(tmpdir)
+    def test_manifest_lookup_rejects_path_outside_base(self, site):
+        """Should not serve paths that are not under the base directory."""
+        manifest = build_static_manifest(site)
 
-            app = FastAPI()
-            setup_static_file_serving(app, static_path, "production", False)
+        assert find_file_in_manifest(manifest, site, Path("/etc/passwd")) is None
 
-            # Should log warning but not crash
 
-    def test_setup_skips_in_dev_without_flag(self):
-        """Should skip in development without serve_static flag."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            static_path = Path(tmpdir)
-            (static_path / "index.html").write_text("<html></html>")
+@pytest.mark.unit
+class TestPrecompressedVariants:
+    """Test serving pre-compressed build output."""
+
+    @pytest.fixture
+    def site(self, tmp_path):
+        root = (tmp_path / "static").resolve()
+        root.mkdir()
+        (root / "index.html").write_text("<html>root</html>")
+        (root / "index.html.gz").write_bytes(b"gzip-body")
+        (root / "index.html.br").write_bytes(b"br-body")
+        (root / "about.html").write_text("<html>about</html>")
+        (root / "about.html.gz").write_bytes(b"gzip-about")
+        return root
+
+    def test_variants_recorded_in_preference_order(self, site):
+        """Should list brotli before gzip and skip files without variants."""
+        variants = build_precompressed_variants(site, build_static_manifest(site))
+
+        assert variants == {
+            site / "index.html": [
+                ("br", site / "index.html.br"),
+                ("gzip", site / "index.html.gz"),
+            ],
+            site / "about.html": [("gzip", site / "about.html.gz")],
+        }
+
+    def test_symlinked_variant_ignored(self, site, tmp_path):
+        """Should not record variants that are symlinks."""
+        (site / "about.html.gz").unlink()
+        (tmp_path / "outside.gz").write_bytes(b"secret")
+        (site / "about.html.gz").symlink_to(tmp_path / "outside.gz")
+
+        variants = build_precompressed_variants(site, build_static_manifest(site))
+
+        assert site / "about.html" not in variants
+
+    @pytest.mark.parametrize(
+        ("accept_encoding", "expected"),
+        [
+            ("gzip, deflate, br", "br"),
+            ("gzip", "gzip"),
+            ("br;q=0, gzip;q=0.5", "gzip"),
+            ("*", "br"),
+            ("br;q=0, *", "gzip"),
+            ("br;foo=1;q=0, gzip", "gzip"),
+            ("br; q=0.000, gzip;q=abc", None),
+            ("identity", None),
+            ("", None),
+        ],
+    )
+    def test_select_precompressed(self, site, accept_encoding, expected):
+        """Should pick the first variant the client accepts."""
+        variants = [("br", site / "index.html.br"), ("gzip", site / "index.html.gz")]
+
+        selected = select_precompressed(variants, accept_encoding)
+
+        assert (selected[0] if selected else None) == expected
+
+    @pytest.mark.parametrize(
+        ("accept_encoding", "encoding", "body"),
+        [
+            ("gzip", "gzip", "<html>gzip</html>"),
+            ("identity", None, "<html>root</html>"),
+        ],
+    )
+    def test_production_serves_variant(
+        self, app, site, accept_encoding, encoding, body
+    ):
+        """Should serve the accepted variant with the media type of the page."""
+        (site / "index.html.br").unlink()
+        (site / "index.html.gz").write_bytes(gzip.compress(b"<html>gzip</html>"))
+        setup_static_file_serving(app, site, "production", False)
+
+        response = TestClient(app).get(
+            "/", headers={"Accept-Encoding": accept_encoding}
+        )
 
-            app = FastAPI()
-            setup_static_file_serving(app, static_path, "development", False)
+        assert response.status_code == 200
+        assert response.text == body
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers.get("content-encoding") == encoding
+        assert response.headers["content-type"].startswith("text/html")
 
-            # Should log development mode message
 
-    def test_setup_serves_in_dev_with_flag(self):
-        """Should serve in development when flag is set."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            static_path = Path(tmpdir)
-            (static_path / "index.html").write_text("<html></html>")
+@pytest.mark.unit
+class TestSetupStaticFileServing:
+    """Test static file serving setup."""
 
-            app = FastAPI()
-            setup_static_file_serving(app, static_path, "development", True)
+    def test_setup_in_production_with_files(self, app, shared_static):
+        """Should setup static serving in production when files exist."""
+        setup_static_file_serving(app, shared_static, "production", False)
+
+        # Should have added catch-all route
+        # (Testing internal FastAPI routing is complex, just verify no errors)
+
+    @pytest.mark.parametrize(
+        ("env", "serve_static", "has_manifest"),
+        [("production", False, True), ("development", True, False)],
+    )
+    def test_setup_builds_manifest_only_in_production(
+        self, app, shared_static, env, serve_static, has_manifest
+    ):
+        """Should index the static directory in production but not in development."""
+        setup_static_file_serving(app, shared_static, env, serve_static)
+
+        assert TestClient(app).get("/").status_code == 200
+        assert hasattr(app.state, "static_manifest") is has_manifest
+        assert app.state.static_root_resolved == str(shared_static.resolve())
+
+    def test_setup_skips_if_no_files(self, app, tmp_path):
+        """Should skip setup if directory is empty."""
+        setup_static_file_serving(app, tmp_path, "production", False)
 
-            # Should setup serving
+        # Should log warning but not crash
 
-    def test_setup_validates_app_directory(self):
-        """Should validate _app directory before mounting."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            static_path = Path(tmpdir)
-            (static_path / "index.html").write_text("<html></html>")
+    def test_setup_skips_in_dev_without_flag(self, app, shared_static):
+        """Should skip in development without serve_static flag."""
+        setup_static_file_serving(app, shared_static, "development", False)
 
-            app_dir = static_path / "_app"
-            app_dir.mkdir()
+        # Should log development mode message
 
-            app = FastAPI()
-            setup_static_file_serving(app, static_path, "production", False)
+    def test_setup_serves_in_dev_with_flag(self, app, shared_static):
+        """Should serve in development when flag is set."""
+        setup_static_file_serving(app, shared_static, "development", True)
 
-            # Should validate and mount _app
+        # Should setup serving
 
-    def test_setup_validates_assets_directory(self):
-        """Should validate assets directory before mounting."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            static_path = Path(tmpdir)
-            (static_path / "index.html").write_text("<html></html>")
+    def test_setup_validates_app_directory(self, app, tmp_path):
+        """Should validate _app directory before mounting."""
+        (tmp_path / "index.html").write_text("<html></html>")
+        (tmp_path / "_app").mkdir()
+
+        setup_static_file_serving(app, tmp_path, "production", False)
 
-            assets_dir = static_path / "assets"
-            assets_dir.mkdir()
+        # Should validate and mount _app
+
+    def test_setup_validates_assets_directory(self, app, tmp_path):
+        """Should validate assets directory before mounting."""
+        (tmp_path / "index.html").write_text("<html></html>")
+        (tmp_path / "assets").mkdir()
 
-            app = FastAPI()
-            setup_static_file_serving(app, static_path, "production", False)
+        setup_static_file_serving(app, tmp_path, "production", False)
 
-            # Should validate and mount assets
+        # Should validate and mount assets
 
 
 @pytest.mark.unit
@@ -686,11 +885,8 @@ class TestFindFileToServeEdgeCases:
 class TestSetupStaticFileServingEdgeCases:
     """Test static file serving setup edge cases."""
 
-    def test_setup_with_missing_static_path(self, tmp_path):
+    def test_setup_with_missing_static_path(self, app, tmp_path):
         """Should handle missing static path gracefully."""
-        from fastapi import FastAPI
-
-        app = FastAPI()
         missing_path = tmp_path / "nonexistent_static"
 
         # Should not crash, just log warning
@@ -701,11 +897,8 @@ class TestSetupStaticFileServingEdgeCases:
         # App should still be configured
         assert app is not None
 
-    def test_setup_production_with_serve_static_true(self, tmp_path):
+    def test_setup_production_with_serve_static_true(self, app, tmp_path):
         """Should serve static files in production when explicitly enabled."""
-        from fastapi import FastAPI
-
-        app = FastAPI()
         static_path = tmp_path / "static"
         static_path.mkdir()
         (static_path / "test.html").write_text("<html></html>")
@@ -717,11 +910,8 @@ class TestSetupStaticFileServingEdgeCases:
         # Should have added routes
         assert len(app.routes) > 0
 
-    def test_setup_development_without_serve_static(self, tmp_path):
+    def test_setup_development_without_serve_static(self, app, tmp_path):
         """Should not serve static files in development by default."""
-        from fastapi import FastAPI
-
-        app = FastAPI()
         static_path = tmp_path / "static"
         static_path.mkdir()
 
@@ -737,48 +927,59 @@ class TestSetupStaticFileServingEdgeCases:
 class TestSafeJoinPathCoverage:
     """Additional tests to increase coverage of safe_join_path."""
 
-    def test_is_relative_to_path_outside_base(self, tmp_path):
-        """Should catch paths that escape base directory validation."""
+    def test_resolved_path_outside_base(self, tmp_path, monkeypatch):
+        """Should reject a path that resolves outside the base directory."""
         base = tmp_path / "static"
         base.mkdir()
 
-        # Create a case where is_relative_to would be False
-        # Try with a path that resolves outside
-        with patch("pathlib.Path.is_relative_to", return_value=False):
-            result = safe_join_path(base, "test.html")
-            assert result is None
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath",
+            lambda path: (
+                str(tmp_path / "elsewhere")
+                if str(path).endswith("test.html")
+                else os.path.realpath(path)
+            ),
+        )
 
-    def test_relative_to_raises_value_error(self, tmp_path):
-        """Should handle ValueError from relative_to check."""
+        assert safe_join_path(base, "test.html") is None
+
+    def test_sibling_with_base_name_prefix_is_outside(self, tmp_path, monkeypatch):
+        """Should not treat a sibling sharing the base name prefix as inside."""
         base = tmp_path / "static"
         base.mkdir()
 
-        # Mock relative_to to raise ValueError
-        with patch("pathlib.Path.relative_to", side_effect=ValueError("test error")):
-            result = safe_join_path(base, "test.html")
-            assert result is None
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath",
+            lambda path: (
+                str(tmp_path / "static-evil")
+                if str(path).endswith("test.html")
+                else os.path.realpath(path)
+            ),
+        )
 
-    def test_path_resolution_runtime_error(self, tmp_path):
+        assert safe_join_path(base, "test.html") is None
+
+    def test_path_resolution_runtime_error(self, tmp_path, monkeypatch):
         """Should handle RuntimeError during path resolution."""
         base = tmp_path / "static"
         base.mkdir()
 
-        # Mock resolve to raise RuntimeError
-        with patch(
-            "pathlib.Path.resolve", side_effect=RuntimeError("resolution error")
-        ):
-            result = safe_join_path(base, "test.html")
-            assert result is None
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath", failing_realpath(RuntimeError)
+        )
 
-    def test_path_resolution_os_error(self, tmp_path):
+        assert safe_join_path(base, "test.html") is None
+
+    def test_path_resolution_os_error(self, tmp_path, monkeypatch):
         """Should handle OSError during path resolution."""
         base = tmp_path / "static"
         base.mkdir()
 
-        # Mock resolve to raise OSError
-        with patch("pathlib.Path.resolve", side_effect=OSError("os error")):
-            result = safe_join_path(base, "test.html")
-            assert result is None
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath", failing_realpath(OSError)
+        )
+
+        assert safe_join_path(base, "test.html") is None
 
 
 @pytest.mark.unit
@@ -790,41 +991,47 @@ class TestSymlinkErrorHandling:
         base = tmp_path / "static"
         base.mkdir()
 
+        (base / "target.txt").touch()
         link = base / "link.txt"
-        link.touch()
+        link.symlink_to(base / "target.txt")
 
-        with patch.object(Path, "is_symlink", return_value=True):
-            with patch.object(
-                Path, "resolve", side_effect=RuntimeError("symlink error")
-            ):
-                result = is_safe_symlink(link, base)
-                assert result is False
+        with patch(
+            "priotag.static_files_utils._realpath",
+            side_effect=RuntimeError("symlink error"),
+        ):
+            result = is_safe_symlink(link, base)
+            assert result is False
 
     def test_symlink_resolve_value_error(self, tmp_path):
         """Should handle ValueError during symlink resolution."""
         base = tmp_path / "static"
         base.mkdir()
 
+        (base / "target.txt").touch()
         link = base / "link.txt"
-        link.touch()
+        link.symlink_to(base / "target.txt")
 
-        with patch.object(Path, "is_symlink", return_value=True):
-            with patch.object(Path, "resolve", side_effect=ValueError("value error")):
-                result = is_safe_symlink(link, base)
-                assert result is False
+        with patch(
+            "priotag.static_files_utils._realpath",
+            side_effect=ValueError("value error"),
+        ):
+            result = is_safe_symlink(link, base)
+            assert result is False
 
     def test_symlink_resolve_os_error(self, tmp_path):
         """Should handle OSError during symlink resolution."""
         base = tmp_path / "static"
         base.mkdir()
 
+        (base / "target.txt").touch()
         link = base / "link.txt"
-        link.touch()
+        link.symlink_to(base / "target.txt")
 
-        with patch.object(Path, "is_symlink", return_value=True):
-            with patch.object(Path, "resolve", side_effect=OSError("os error")):
-                result = is_safe_symlink(link, base)
-                assert result is False
+        with patch(
+            "priotag.static_files_utils._realpath", side_effect=OSError("os error")
+        ):
+            result = is_safe_symlink(link, base)
+            assert result is False
 
 
 @pytest.mark.unit
@@ -855,7 +1062,10 @@ class TestDirectoryValidationCoverage:
         subdir = base / "subdir"
         subdir.mkdir()
 
-        with patch.object(Path, "resolve", side_effect=RuntimeError("runtime error")):
+        with patch(
+            "priotag.static_files_utils._realpath",
+            side_effect=RuntimeError("runtime error"),
+        ):
             result = validate_directory_safety(subdir, base)
             assert result is False
 
@@ -867,7 +1077,10 @@ class TestDirectoryValidationCoverage:
         subdir = base / "subdir"
         subdir.mkdir()
 
-        with patch.object(Path, "resolve", side_effect=ValueError("value error")):
+        with patch(
+            "priotag.static_files_utils._realpath",
+            side_effect=ValueError("value error"),
+        ):
             result = validate_directory_safety(subdir, base)
             assert result is False
 
@@ -879,7 +1092,9 @@ class TestDirectoryValidationCoverage:
         subdir = base / "subdir"
         subdir.mkdir()
 
-        with patch.object(Path, "resolve", side_effect=OSError("os error")):
+        with patch(
+            "priotag.static_files_utils._realpath", side_effect=OSError("os error")
+        ):
             result = validate_directory_safety(subdir, base)
             assert result is False
 
@@ -902,7 +1117,7 @@ class TestFindFileToServeCoverage:
         result = find_file_to_serve(base, subdir)
         assert result == index
 
-    def test_directory_index_html_validation_os_error(self, tmp_path):
+    def test_directory_index_html_validation_os_error(self, tmp_path, monkeypatch):
         """Should handle OSError when validating directory index.html."""
         base = tmp_path / "static"
         base.mkdir()
@@ -910,23 +1125,21 @@ class TestFindFileToServeCoverage:
         subdir = base / "docs"
         subdir.mkdir()
 
+        # Only symlinked candidates are resolved
+        (subdir / "docs.html").write_text("<html></html>")
         index = subdir / "index.html"
-        index.write_text("<html></html>")
-
-        # Mock resolve to raise OSError for index file
-        original_resolve = Path.resolve
+        index.symlink_to(subdir / "docs.html")
 
-        def selective_resolve(self, *args, **kwargs):
-            if self.name == "index.html":
-                raise OSError("os error")
-            return original_resolve(self, *args, **kwargs)
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath",
+            failing_realpath(OSError, "index.html"),
+        )
 
-        with patch.object(Path, "resolve", selective_resolve):
-            result = find_file_to_serve(base, subdir)
-            # Should fall back to other options
-            assert result is None or result != index
+        result = find_file_to_serve(base, subdir)
+        # Should fall back to other options
+        assert result is None or result != index
 
-    def test_directory_index_html_value_error(self, tmp_path):
+    def test_directory_index_html_value_error(self, tmp_path, monkeypatch):
         """Should handle ValueError when validating directory index.html."""
         base = tmp_path / "static"
         base.mkdir()
@@ -934,23 +1147,21 @@ class TestFindFileToServeCoverage:
         subdir = base / "docs"
         subdir.mkdir()
 
+        # Only symlinked candidates are resolved
+        (subdir / "docs.html").write_text("<html></html>")
         index = subdir / "index.html"
-        index.write_text("<html></html>")
-
-        # Mock resolve to raise ValueError for index file
-        original_resolve = Path.resolve
+        index.symlink_to(subdir / "docs.html")
 
-        def selective_resolve(self, *args, **kwargs):
-            if self.name == "index.html":
-                raise ValueError("value error")
-            return original_resolve(self, *args, **kwargs)
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath",
+            failing_realpath(ValueError, "index.html"),
+        )
 
-        with patch.object(Path, "resolve", selective_resolve):
-            result = find_file_to_serve(base, subdir)
-            # Should fall back to other options
-            assert result is None or result != index
+        result = find_file_to_serve(base, subdir)
+        # Should fall back to other options
+        assert result is None or result != index
 
-    def test_html_extension_fallback_os_error_handling(self, tmp_path):
+    def test_html_extension_fallback_os_error_handling(self, tmp_path, monkeypatch):
         """Should handle OSError when trying .html extension fallback."""
         base = tmp_path / "static"
         base.mkdir()
@@ -962,23 +1173,21 @@ class TestFindFileToServeCoverage:
         # Request for file that doesn't exist
         requested = base / "page"
 
-        # Create page.html but make it raise OSError when resolving
+        # Create page.html as a symlink and make it raise OSError when resolving
+        (base / "real-page.html").write_text("<html></html>")
         html_file = base / "page.html"
-        html_file.write_text("<html></html>")
+        html_file.symlink_to(base / "real-page.html")
 
-        original_resolve = Path.resolve
-
-        def selective_resolve(self, *args, **kwargs):
-            if self.name == "page.html":
-                raise OSError("os error")
-            return original_resolve(self, *args, **kwargs)
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath",
+            failing_realpath(OSError, "page.html"),
+        )
 
-        with patch.object(Path, "resolve", selective_resolve):
-            result = find_file_to_serve(base, requested)
-            # Should fall back to root index
-            assert result == root_index
+        result = find_file_to_serve(base, requested)
+        # Should fall back to root index
+        assert result == root_index
 
-    def test_html_extension_fallback_value_error_handling(self, tmp_path):
+    def test_html_extension_fallback_value_error_handling(self, tmp_path, monkeypatch):
         """Should handle ValueError when trying .html extension fallback."""
         base = tmp_path / "static"
         base.mkdir()
@@ -990,68 +1199,63 @@ class TestFindFileToServeCoverage:
         # Request for file that doesn't exist
         requested = base / "page"
 
-        # Create page.html but make it raise ValueError when resolving
+        # Create page.html as a symlink and make it raise ValueError when resolving
+        (base / "real-page.html").write_text("<html></html>")
         html_file = base / "page.html"
-        html_file.write_text("<html></html>")
+        html_file.symlink_to(base / "real-page.html")
 
-        original_resolve = Path.resolve
-
-        def selective_resolve(self, *args, **kwargs):
-            if self.name == "page.html":
-                raise ValueError("value error")
-            return original_resolve(self, *args, **kwargs)
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath",
+            failing_realpath(ValueError, "page.html"),
+        )
 
-        with patch.object(Path, "resolve", selective_resolve):
-            result = find_file_to_serve(base, requested)
-            # Should fall back to root index
-            assert result == root_index
+        result = find_file_to_serve(base, requested)
+        # Should fall back to root index
+        assert result == root_index
 
 
 @pytest.mark.unit
 class TestSetupStaticServingCoverage:
     """Additional tests for setup_static_file_serving coverage."""
 
-    def test_static_path_resolve_error(self, tmp_path):
+    def test_static_path_resolve_error(self, app, tmp_path, monkeypatch):
         """Should handle path resolution errors gracefully."""
-        from fastapi import FastAPI
-
-        app = FastAPI()
         static_path = tmp_path / "static"
         static_path.mkdir()
         (static_path / "test.html").write_text("<html></html>")
 
-        with patch.object(Path, "resolve", side_effect=ValueError("resolve error")):
-            # Should log error and return early
-            setup_static_file_serving(
-                app=app, static_path=static_path, env="production", serve_static=False
-            )
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath", failing_realpath(ValueError)
+        )
+
+        # Should log error and return early
+        setup_static_file_serving(
+            app=app, static_path=static_path, env="production", serve_static=False
+        )
 
-            # Should not crash
-            assert app is not None
+        # Should not crash
+        assert app is not None
 
-    def test_static_path_resolve_os_error(self, tmp_path):
+    def test_static_path_resolve_os_error(self, app, tmp_path, monkeypatch):
         """Should handle OS errors during path resolution."""
-        from fastapi import FastAPI
-
-        app = FastAPI()
         static_path = tmp_path / "static"
         static_path.mkdir()
         (static_path / "test.html").write_text("<html></html>")
 
-        with patch.object(Path, "resolve", side_effect=OSError("os error")):
-            # Should log error and return early
-            setup_static_file_serving(
-                app=app, static_path=static_path, env="production", serve_static=False
-            )
+        monkeypatch.setattr(
+            "priotag.static_files_utils._realpath", failing_realpath(OSError)
+        )
 
-            # Should not crash
-            assert app is not None
+        # Should log error and return early
+        setup_static_file_serving(
+            app=app, static_path=static_path, env="production", serve_static=False
+        )
 
-    def test_unsafe_app_directory_detected(self, tmp_path):
-        """Should detect and reject unsafe _app directory."""
-        from fastapi import FastAPI
+        # Should not crash
+        assert app is not None
 
-        app = FastAPI()
+    def test_unsafe_app_directory_detected(self, app, tmp_path):
+        """Should detect and reject unsafe _app directory."""
         static_path = tmp_path / "static"
         static_path.mkdir()
         (static_path / "index.html").write_text("<html></html>")
@@ -1071,11 +1275,73 @@ class TestSetupStaticServingCoverage:
         # Verify app is still configured
         assert app is not None
 
-    def test_unsafe_assets_directory_detected(self, tmp_path):
-        """Should detect and reject unsafe assets directory."""
-        from fastapi import FastAPI
+    def test_build_directories_are_mounted(self, app, tmp_path):
+        """Should mount real _app and assets directories under their routes."""
+        static_path = tmp_path / "static"
+        static_path.mkdir()
+        (static_path / "index.html").write_text("<html></html>")
+        (static_path / "_app").mkdir()
+        (static_path / "assets").mkdir()
 
-        app = FastAPI()
+        setup_static_file_serving(
+            app=app, static_path=static_path, env="production", serve_static=False
+        )
+
+        route_names = {getattr(route, "name", None) for route in app.routes}
+        assert {"static_app", "assets"} <= route_names
+
+    def test_immutable_build_output_cached(self, app, tmp_path):
+        """Should mark only content-hashed _app/immutable files as immutable."""
+        static_path = tmp_path / "static"
+        (static_path / "_app" / "immutable").mkdir(parents=True)
+        (static_path / "index.html").write_text("<html></html>")
+        (static_path / "_app" / "immutable" / "start.abc123.js").write_text("")
+        (static_path / "_app" / "version.json").write_text("{}")
+        (static_path / "assets" / "immutable").mkdir(parents=True)
+        (static_path / "assets" / "immutable" / "logo.svg").write_text("<svg/>")
+
+        setup_static_file_serving(
+            app=app, static_path=static_path, env="production", serve_static=False
+        )
+        client = TestClient(app)
+
+        immutable = client.get("/_app/immutable/start.abc123.js")
+        revalidated = client.get(
+            "/_app/immutable/start.abc123.js",
+            headers={"If-None-Match": immutable.headers["etag"]},
+        )
+        version = client.get("/_app/version.json")
+        asset = client.get("/assets/immutable/logo.svg")
+
+        assert immutable.headers["cache-control"] == (
+            "public, max-age=31536000, immutable"
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.headers["cache-control"] == (
+            "public, max-age=31536000, immutable"
+        )
+        assert "cache-control" not in version.headers
+        assert asset.status_code == 200
+        assert "cache-control" not in asset.headers
+
+    def test_symlinked_app_directory_inside_base_not_mounted(self, app, tmp_path):
+        """Should refuse a symlinked _app directory even if it stays inside base."""
+        static_path = tmp_path / "static"
+        static_path.mkdir()
+        (static_path / "index.html").write_text("<html></html>")
+        (static_path / "build").mkdir()
+        (static_path / "_app").symlink_to(static_path / "build")
+
+        setup_static_file_serving(
+            app=app, static_path=static_path, env="production", serve_static=False
+        )
+
+        assert "static_app" not in {
+            getattr(route, "name", None) for route in app.routes
+        }
+
+    def test_unsafe_assets_directory_detected(self, app, tmp_path):
+        """Should detect and reject unsafe assets directory."""
         static_path = tmp_path / "static"
         static_path.mkdir()
         (static_path / "index.html").write_text("<html></html>")
@@ -11,26 +11,39 @@ Tests cover:
 - update_last_seen (throttling and database updates)
 """
 
+import asyncio
 import base64
 from datetime import UTC, datetime
-from unittest.mock import AsyncMock, Mock, patch
+from unittest.mock import Mock, patch
 
 import pytest
 from fastapi import HTTPException, Response
+from pydantic import ValidationError
 
 from priotag.models.auth import SessionInfo
 from priotag.models.pocketbase_schemas import UsersResponse
 from priotag.utils import (
+    _last_seen_tasks,
     extract_session_info_from_record,
     get_client_ip,
     get_current_dek,
     get_current_token,
     require_admin,
+    schedule_last_seen_update,
     update_last_seen,
     verify_token,
 )
 
 
+@pytest.fixture
+def pb_client(monkeypatch, mock_pocketbase_client):
+    """Mock PocketBase client handed out by get_pocketbase_client."""
+    monkeypatch.setattr(
+        "priotag.utils.get_pocketbase_client", lambda: mock_pocketbase_client
+    )
+    return mock_pocketbase_client
+
+
 @pytest.mark.unit
 class TestGetCurrentToken:
     """Test auth token extraction from cookie."""
@@ -129,6 +142,33 @@ class TestExtractSessionInfo:
         assert result.username == sample_admin_data["username"]
         assert result.is_admin is True
 
+    @pytest.mark.parametrize(
+        ("data_fixture", "is_admin"),
+        [("sample_user_data", False), ("sample_admin_data", True)],
+    )
+    def test_extract_session_info_from_raw_record(
+        self, request, data_fixture, is_admin
+    ):
+        """Should extract the same session info from the raw record JSON."""
+        data = request.getfixturevalue(data_fixture)
+
+        result = extract_session_info_from_record(data)
+
+        assert result == extract_session_info_from_record(UsersResponse(**data))
+        assert result.is_admin is is_admin
+
+    def test_extract_session_info_raw_record_validated(self, sample_user_data):
+        """Should reject a raw record with invalid session fields."""
+        with pytest.raises(ValidationError):
+            extract_session_info_from_record({**sample_user_data, "id": None})
+
+    def test_extracted_session_info_is_immutable(self, sample_user_data):
+        """Should not allow privileges to change after extraction."""
+        result = extract_session_info_from_record(UsersResponse(**sample_user_data))
+
+        with pytest.raises(ValidationError):
+            result.is_admin = True
+
 
 @pytest.mark.unit
 class TestGetClientIP:
@@ -198,112 +238,124 @@ class TestUpdateLastSeen:
     """Test lastSeen update with throttling."""
 
     @pytest.mark.asyncio
-    async def test_update_last_seen_first_time(self, fake_redis):
+    async def test_update_last_seen_first_time(self, pb_client, fake_redis):
         """Should update lastSeen on first call."""
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_response = Mock()
+        mock_response.status_code = 200
+        pb_client.patch.return_value = mock_response
 
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_client.patch.return_value = mock_response
+        await update_last_seen("user123", "token123", fake_redis)
 
-            await update_last_seen("user123", "token123", fake_redis)
+        # Should have called PocketBase PATCH
+        pb_client.patch.assert_called_once()
 
-            # Should have called PocketBase PATCH
-            mock_client.patch.assert_called_once()
-
-            # Should have set throttle key
-            assert fake_redis.get("lastseen:user123") is not None
+        # Should have set throttle key
+        assert fake_redis.get("lastseen:user123") is not None
 
     @pytest.mark.asyncio
-    async def test_update_last_seen_throttled(self, fake_redis):
+    async def test_update_last_seen_throttled(self, pb_client, fake_redis):
         """Should skip update when recently updated."""
         # Set throttle key
         fake_redis.setex("lastseen:user123", 3600, "1")
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
-
-            await update_last_seen("user123", "token123", fake_redis)
+        await update_last_seen("user123", "token123", fake_redis)
 
-            # Should NOT have called PocketBase
-            mock_client.patch.assert_not_called()
+        # Should NOT have called PocketBase
+        pb_client.patch.assert_not_called()
 
     @pytest.mark.asyncio
-    async def test_update_last_seen_sets_current_time(self, fake_redis):
+    async def test_update_last_seen_sets_current_time(self, pb_client, fake_redis):
         """Should set current timestamp in lastSeen."""
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
-
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_client.patch.return_value = mock_response
+        mock_response = Mock()
+        mock_response.status_code = 200
+        pb_client.patch.return_value = mock_response
 
-            before_time = datetime.now(UTC)
+        before_time = datetime.now(UTC)
 
-            await update_last_seen("user123", "token123", fake_redis)
+        await update_last_seen("user123", "token123", fake_redis)
 
-            # Check the lastSeen value sent to PocketBase
-            patch_call = mock_client.patch.call_args
-            json_data = patch_call.kwargs["json"]
-            last_seen_str = json_data["lastSeen"]
-            last_seen_time = datetime.fromisoformat(
-                last_seen_str.replace("Z", "+00:00")
-            )
+        # Check the lastSeen value sent to PocketBase
+        patch_call = pb_client.patch.call_args
+        json_data = patch_call.kwargs["json"]
+        last_seen_str = json_data["lastSeen"]
+        last_seen_time = datetime.fromisoformat(last_seen_str.replace("Z", "+00:00"))
 
-            # Should be recent
-            assert last_seen_time >= before_time
+        # Should be recent
+        assert last_seen_time >= before_time
 
     @pytest.mark.asyncio
-    async def test_update_last_seen_handles_patch_failure(self, fake_redis):
+    async def test_update_last_seen_handles_patch_failure(self, pb_client, fake_redis):
         """Should handle PocketBase update failure gracefully."""
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_response = Mock()
+        mock_response.status_code = 500
+        mock_response.text = "Server error"
+        pb_client.patch.return_value = mock_response
 
-            mock_response = Mock()
-            mock_response.status_code = 500
-            mock_response.text = "Server error"
-            mock_client.patch.return_value = mock_response
+        # Should not raise exception
+        await update_last_seen("user123", "token123", fake_redis)
 
-            # Should not raise exception
-            await update_last_seen("user123", "token123", fake_redis)
+        # Should release the throttle so the next request retries
+        assert fake_redis.get("lastseen:user123") is None
 
     @pytest.mark.asyncio
-    async def test_update_last_seen_handles_network_error(self, fake_redis):
+    async def test_update_last_seen_handles_network_error(self, pb_client, fake_redis):
         """Should handle network errors gracefully."""
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+        import httpx
 
-            import httpx
+        pb_client.patch.side_effect = httpx.RequestError("Network error")
 
-            mock_client.patch.side_effect = httpx.RequestError("Network error")
-
-            # Should not raise exception
-            await update_last_seen("user123", "token123", fake_redis)
+        # Should not raise exception
+        await update_last_seen("user123", "token123", fake_redis)
 
     @pytest.mark.asyncio
-    async def test_update_last_seen_handles_redis_error(self, fake_redis):
+    async def test_update_last_seen_handles_redis_error(self, pb_client, fake_redis):
         """Should continue even if Redis throttle check fails."""
         # Make Redis raise error
-        fake_redis.get = Mock(side_effect=Exception("Redis error"))
+        fake_redis.set = Mock(side_effect=Exception("Redis error"))
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_response = Mock()
+        mock_response.status_code = 200
+        pb_client.patch.return_value = mock_response
 
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_client.patch.return_value = mock_response
+        # Should still attempt update
+        await update_last_seen("user123", "token123", fake_redis)
 
-            # Should still attempt update
-            await update_last_seen("user123", "token123", fake_redis)
+        pb_client.patch.assert_called_once()
 
-            mock_client.patch.assert_called_once()
+    @pytest.mark.asyncio
+    async def test_update_last_seen_concurrent_single_update(
+        self, pb_client, fake_redis
+    ):
+        """Should update PocketBase once when requests race for the throttle."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+
+        async def slow_patch(*args, **kwargs):
+            # Suspend like a real request so the other updates run meanwhile
+            await asyncio.sleep(0)
+            return mock_response
+
+        pb_client.patch.side_effect = slow_patch
+
+        await asyncio.gather(
+            *(update_last_seen("user123", "token123", fake_redis) for _ in range(3))
+        )
+
+        pb_client.patch.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_schedule_last_seen_update_keeps_task(self, fake_redis):
+        """Should hold the background task until it finishes."""
+        pending_before = set(_last_seen_tasks)
+        with patch("priotag.utils.update_last_seen") as mock_update:
+            schedule_last_seen_update("user123", "token123", fake_redis)
+
+            (task,) = _last_seen_tasks - pending_before
+            await task
+            await asyncio.sleep(0)
+
+            mock_update.assert_awaited_once_with("user123", "token123", fake_redis)
+            assert task not in _last_seen_tasks
 
 
 @pytest.mark.unit
@@ -342,332 +394,318 @@ class TestVerifyToken:
             mock_update.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_verify_token_cache_miss_success(self, fake_redis, sample_user_data):
+    async def test_verify_token_single_redis_lookup(
+        self, fake_redis, sample_session_info
+    ):
+        """Should read blacklist, rejection marker and session with one MGET."""
+        fake_redis.setex(
+            "session:token123", 3600, sample_session_info.model_dump_json()
+        )
+        fake_redis.mget = Mock(wraps=fake_redis.mget)
+        fake_redis.get = Mock(wraps=fake_redis.get)
+        fake_redis.exists = Mock(wraps=fake_redis.exists)
+
+        with patch("priotag.utils.update_last_seen"):
+            await verify_token(Response(), "token123", fake_redis)
+
+        fake_redis.mget.assert_called_once_with(
+            "blacklist:token123", "invalid:token123", "session:token123"
+        )
+        fake_redis.get.assert_not_called()
+        fake_redis.exists.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_verify_token_cache_miss_success(
+        self, pb_client, fake_redis, sample_user_data
+    ):
         """Should fetch from PocketBase on cache miss."""
         mock_response = Response()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 200
+        mock_pb_response.json.return_value = {
+            "token": "token123",
+            "record": sample_user_data,
+        }
+        pb_client.post.return_value = mock_pb_response
 
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 200
-            mock_pb_response.json.return_value = {
-                "token": "token123",
-                "record": sample_user_data,
-            }
-            mock_client.post.return_value = mock_pb_response
-
-            with patch("priotag.utils.update_last_seen"):
-                result = await verify_token(mock_response, "token123", fake_redis)
+        with patch("priotag.utils.update_last_seen"):
+            result = await verify_token(mock_response, "token123", fake_redis)
 
-                assert result.id == sample_user_data["id"]
-                assert result.username == sample_user_data["username"]
+            assert result.id == sample_user_data["id"]
+            assert result.username == sample_user_data["username"]
 
-                # Should cache the session
-                cached = fake_redis.get("session:token123")
-                assert cached is not None
+            # Should cache the session
+            cached = fake_redis.get("session:token123")
+            assert cached is not None
 
     @pytest.mark.asyncio
     async def test_verify_token_refresh_updates_cookie(
-        self, fake_redis, sample_user_data
+        self, pb_client, fake_redis, sample_user_data
     ):
         """Should update cookie when token is refreshed."""
         mock_response = Response()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
-
-            # Return different token (refreshed)
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 200
-            mock_pb_response.json.return_value = {
-                "token": "new_token123",  # Different token
-                "record": sample_user_data,
-            }
-            mock_client.post.return_value = mock_pb_response
+        # Return different token (refreshed)
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 200
+        mock_pb_response.json.return_value = {
+            "token": "new_token123",  # Different token
+            "record": sample_user_data,
+        }
+        pb_client.post.return_value = mock_pb_response
 
-            with patch("priotag.utils.update_last_seen"):
-                await verify_token(mock_response, "old_token", fake_redis)
+        with patch("priotag.utils.update_last_seen"):
+            await verify_token(mock_response, "old_token", fake_redis)
 
-                # Should have set new cookie (check in headers)
-                # Response.set_cookie adds to headers, not cookies attribute
-                assert "set-cookie" in mock_response.headers
+            # Should have set new cookie (check in headers)
+            # Response.set_cookie adds to headers, not cookies attribute
+            assert "set-cookie" in mock_response.headers
 
     @pytest.mark.asyncio
-    async def test_verify_token_admin_shorter_ttl(self, fake_redis, sample_admin_data):
+    async def test_verify_token_admin_shorter_ttl(
+        self, pb_client, fake_redis, sample_admin_data
+    ):
         """Should use shorter TTL for admin sessions."""
         mock_response = Response()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
-
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 200
-            mock_pb_response.json.return_value = {
-                "token": "token123",
-                "record": sample_admin_data,
-            }
-            mock_client.post.return_value = mock_pb_response
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 200
+        mock_pb_response.json.return_value = {
+            "token": "token123",
+            "record": sample_admin_data,
+        }
+        pb_client.post.return_value = mock_pb_response
 
-            with patch("priotag.utils.update_last_seen"):
-                await verify_token(mock_response, "token123", fake_redis)
+        with patch("priotag.utils.update_last_seen"):
+            await verify_token(mock_response, "token123", fake_redis)
 
-                # Check TTL (admin should be 900 seconds)
-                ttl = fake_redis.ttl("session:token123")
-                assert ttl <= 900
+            # Check TTL (admin should be 900 seconds)
+            ttl = fake_redis.ttl("session:token123")
+            assert ttl <= 900
 
     @pytest.mark.asyncio
-    async def test_verify_token_pb_auth_failure(self, fake_redis):
+    async def test_verify_token_pb_auth_failure(self, pb_client, fake_redis):
         """Should raise 401 when PocketBase auth refresh fails."""
         mock_response = Response()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 401
+        pb_client.post.return_value = mock_pb_response
 
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 401
-            mock_client.post.return_value = mock_pb_response
+        with pytest.raises(HTTPException) as exc_info:
+            await verify_token(mock_response, "invalid_token", fake_redis)
 
-            with pytest.raises(HTTPException) as exc_info:
-                await verify_token(mock_response, "invalid_token", fake_redis)
+        assert exc_info.value.status_code == 401
 
+    @pytest.mark.asyncio
+    async def test_verify_token_rejected_token_cached(self, pb_client, fake_redis):
+        """Should not ask PocketBase again for a recently rejected token."""
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 401
+        pb_client.post.return_value = mock_pb_response
+
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc_info:
+                await verify_token(Response(), "invalid_token", fake_redis)
             assert exc_info.value.status_code == 401
 
+        pb_client.post.assert_called_once()
+        assert 0 < fake_redis.ttl("invalid:invalid_token") <= 60
+
     @pytest.mark.asyncio
-    async def test_verify_token_pb_connection_error(self, fake_redis):
+    async def test_verify_token_pb_connection_error(self, pb_client, fake_redis):
         """Should raise 503 on PocketBase connection error."""
         mock_response = Response()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+        import httpx
 
-            import httpx
+        pb_client.post.side_effect = httpx.RequestError("Connection failed")
 
-            mock_client.post.side_effect = httpx.RequestError("Connection failed")
-
-            with pytest.raises(HTTPException) as exc_info:
-                await verify_token(mock_response, "token123", fake_redis)
+        with pytest.raises(HTTPException) as exc_info:
+            await verify_token(mock_response, "token123", fake_redis)
 
-            assert exc_info.value.status_code == 503
+        assert exc_info.value.status_code == 503
 
     @pytest.mark.asyncio
-    async def test_verify_token_handles_invalid_cache_data(self, fake_redis):
+    async def test_verify_token_handles_invalid_cache_data(self, pb_client, fake_redis):
         """Should fall back to PocketBase if cached data is invalid."""
         mock_response = Response()
 
         # Set invalid JSON in cache
         fake_redis.set("session:token123", "invalid json{{{")
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
-
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 200
-            mock_pb_response.json.return_value = {
-                "token": "token123",
-                "record": {
-                    "id": "user123",
-                    "username": "testuser",
-                    "email": "test@example.com",
-                    "emailVisibility": False,
-                    "role": "user",
-                    "salt": "dGVzdF9zYWx0",
-                    "user_wrapped_dek": "d3JhcHBlZF9kZWs=",
-                    "admin_wrapped_dek": "YWRtaW5fd3JhcHBlZA==",
-                    "encrypted_fields": "ZW5jcnlwdGVk",
-                    "lastSeen": "2024-01-01T00:00:00Z",
-                    "verified": True,
-                    "collectionId": "coll",
-                    "collectionName": "users",
-                    "created": "2024-01-01T00:00:00Z",
-                    "updated": "2024-01-01T00:00:00Z",
-                },
-            }
-            mock_client.post.return_value = mock_pb_response
-
-            with patch("priotag.utils.update_last_seen"):
-                # Should not raise, falls back to PocketBase
-                result = await verify_token(mock_response, "token123", fake_redis)
-
-                assert result.id == "user123"
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 200
+        mock_pb_response.json.return_value = {
+            "token": "token123",
+            "record": {
+                "id": "user123",
+                "username": "testuser",
+                "email": "test@example.com",
+                "emailVisibility": False,
+                "role": "user",
+                "salt": "dGVzdF9zYWx0",
+                "user_wrapped_dek": "d3JhcHBlZF9kZWs=",
+                "admin_wrapped_dek": "YWRtaW5fd3JhcHBlZA==",
+                "encrypted_fields": "ZW5jcnlwdGVk",
+                "lastSeen": "2024-01-01T00:00:00Z",
+                "verified": True,
+                "collectionId": "coll",
+                "collectionName": "users",
+                "created": "2024-01-01T00:00:00Z",
+                "updated": "2024-01-01T00:00:00Z",
+            },
+        }
+        pb_client.post.return_value = mock_pb_response
+
+        with patch("priotag.utils.update_last_seen"):
+            # Should not raise, falls back to PocketBase
+            result = await verify_token(mock_response, "token123", fake_redis)
+
+            assert result.id == "user123"
 
     @pytest.mark.asyncio
-    async def test_verify_token_handles_redis_error(self, fake_redis):
+    async def test_verify_token_handles_redis_error(self, pb_client, fake_redis):
         """Should fall back to PocketBase on Redis error."""
         mock_response = Response()
 
         # Make Redis raise error
-        fake_redis.get = Mock(side_effect=Exception("Redis down"))
-
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
-
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 200
-            mock_pb_response.json.return_value = {
-                "token": "token123",
-                "record": {
-                    "id": "user123",
-                    "username": "testuser",
-                    "email": "test@example.com",
-                    "emailVisibility": False,
-                    "role": "user",
-                    "salt": "dGVzdF9zYWx0",
-                    "user_wrapped_dek": "d3JhcHBlZF9kZWs=",
-                    "admin_wrapped_dek": "YWRtaW5fd3JhcHBlZA==",
-                    "encrypted_fields": "ZW5jcnlwdGVk",
-                    "lastSeen": "2024-01-01T00:00:00Z",
-                    "verified": True,
-                    "collectionId": "coll",
-                    "collectionName": "users",
-                    "created": "2024-01-01T00:00:00Z",
-                    "updated": "2024-01-01T00:00:00Z",
-                },
-            }
-            mock_client.post.return_value = mock_pb_response
-
-            with patch("priotag.utils.update_last_seen"):
-                # Should not raise, falls back to PocketBase
-                result = await verify_token(mock_response, "token123", fake_redis)
-
-                assert result.id == "user123"
+        fake_redis.mget = Mock(side_effect=Exception("Redis down"))
+
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 200
+        mock_pb_response.json.return_value = {
+            "token": "token123",
+            "record": {
+                "id": "user123",
+                "username": "testuser",
+                "email": "test@example.com",
+                "emailVisibility": False,
+                "role": "user",
+                "salt": "dGVzdF9zYWx0",
+                "user_wrapped_dek": "d3JhcHBlZF9kZWs=",
+                "admin_wrapped_dek": "YWRtaW5fd3JhcHBlZA==",
+                "encrypted_fields": "ZW5jcnlwdGVk",
+                "lastSeen": "2024-01-01T00:00:00Z",
+                "verified": True,
+                "collectionId": "coll",
+                "collectionName": "users",
+                "created": "2024-01-01T00:00:00Z",
+                "updated": "2024-01-01T00:00:00Z",
+            },
+        }
+        pb_client.post.return_value = mock_pb_response
+
+        with patch("priotag.utils.update_last_seen"):
+            # Should not raise, falls back to PocketBase
+            result = await verify_token(mock_response, "token123", fake_redis)
+
+            assert result.id == "user123"
 
     @pytest.mark.asyncio
-    async def test_verify_token_blacklist_check_error(self, fake_redis):
+    async def test_verify_token_blacklist_check_error(self, pb_client, fake_redis):
         """Should continue if blacklist check fails (don't block valid users)."""
         mock_response = Response()
 
-        # Make blacklist check raise error
-        def blacklist_error(key):
-            if key.startswith("blacklist:"):
-                raise Exception("Redis error")
-            return None
-
-        fake_redis.get = Mock(side_effect=blacklist_error)
-
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
-
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 200
-            mock_pb_response.json.return_value = {
-                "token": "token123",
-                "record": {
-                    "id": "user123",
-                    "username": "testuser",
-                    "email": "test@example.com",
-                    "emailVisibility": False,
-                    "role": "user",
-                    "salt": "dGVzdF9zYWx0",
-                    "user_wrapped_dek": "d3JhcHBlZF9kZWs=",
-                    "admin_wrapped_dek": "YWRtaW5fd3JhcHBlZA==",
-                    "encrypted_fields": "ZW5jcnlwdGVk",
-                    "lastSeen": "2024-01-01T00:00:00Z",
-                    "verified": True,
-                    "collectionId": "coll",
-                    "collectionName": "users",
-                    "created": "2024-01-01T00:00:00Z",
-                    "updated": "2024-01-01T00:00:00Z",
-                },
-            }
-            mock_client.post.return_value = mock_pb_response
-
-            with patch("priotag.utils.update_last_seen"):
-                # Should not raise, continues even if blacklist check fails
-                result = await verify_token(mock_response, "token123", fake_redis)
-                assert result.id == "user123"
+        # Make the combined blacklist and session lookup raise error
+        fake_redis.mget = Mock(side_effect=Exception("Redis error"))
+
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 200
+        mock_pb_response.json.return_value = {
+            "token": "token123",
+            "record": {
+                "id": "user123",
+                "username": "testuser",
+                "email": "test@example.com",
+                "emailVisibility": False,
+                "role": "user",
+                "salt": "dGVzdF9zYWx0",
+                "user_wrapped_dek": "d3JhcHBlZF9kZWs=",
+                "admin_wrapped_dek": "YWRtaW5fd3JhcHBlZA==",
+                "encrypted_fields": "ZW5jcnlwdGVk",
+                "lastSeen": "2024-01-01T00:00:00Z",
+                "verified": True,
+                "collectionId": "coll",
+                "collectionName": "users",
+                "created": "2024-01-01T00:00:00Z",
+                "updated": "2024-01-01T00:00:00Z",
+            },
+        }
+        pb_client.post.return_value = mock_pb_response
+
+        with patch("priotag.utils.update_last_seen"):
+            # Should not raise, continues even if blacklist check fails
+            result = await verify_token(mock_response, "token123", fake_redis)
+            assert result.id == "user123"
 
     @pytest.mark.asyncio
     async def test_verify_token_session_deletion_error(
-        self, fake_redis, sample_user_data
+        self, pb_client, fake_redis, sample_user_data
     ):
         """Should handle error when deleting old session."""
         mock_response = Response()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+        # Mock token refresh response
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 200
+        mock_pb_response.json.return_value = {
+            "token": "new_token",  # Different token triggers deletion
+            "record": sample_user_data,
+        }
+        pb_client.post.return_value = mock_pb_response
 
-            # Mock token refresh response
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 200
-            mock_pb_response.json.return_value = {
-                "token": "new_token",  # Different token triggers deletion
-                "record": sample_user_data,
-            }
-            mock_client.post.return_value = mock_pb_response
+        # Make delete raise error for old session
+        original_delete = fake_redis.delete
 
-            # Make delete raise error for old session
-            original_delete = fake_redis.delete
+        def delete_error(key):
+            if "old_token" in str(key):
+                raise Exception("Redis delete failed")
+            return original_delete(key)
 
-            def delete_error(key):
-                if "old_token" in str(key):
-                    raise Exception("Redis delete failed")
-                return original_delete(key)
+        fake_redis.delete = Mock(side_effect=delete_error)
 
-            fake_redis.delete = Mock(side_effect=delete_error)
-
-            with patch("priotag.utils.update_last_seen"):
-                # Should not raise, logs warning and continues
-                result = await verify_token(mock_response, "old_token", fake_redis)
-                assert result.id == sample_user_data["id"]
+        with patch("priotag.utils.update_last_seen"):
+            # Should not raise, logs warning and continues
+            result = await verify_token(mock_response, "old_token", fake_redis)
+            assert result.id == sample_user_data["id"]
 
     @pytest.mark.asyncio
-    async def test_verify_token_setex_error(self, fake_redis, sample_user_data):
+    async def test_verify_token_setex_error(
+        self, pb_client, fake_redis, sample_user_data
+    ):
         """Should handle error when setting new session in Redis."""
         mock_response = Response()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
-
-            mock_pb_response = Mock()
-            mock_pb_response.status_code = 200
-            mock_pb_response.json.return_value = {
-                "token": "new_token",
-                "record": sample_user_data,
-            }
-            mock_client.post.return_value = mock_pb_response
+        mock_pb_response = Mock()
+        mock_pb_response.status_code = 200
+        mock_pb_response.json.return_value = {
+            "token": "new_token",
+            "record": sample_user_data,
+        }
+        pb_client.post.return_value = mock_pb_response
 
-            # Make setex raise error
-            fake_redis.setex = Mock(side_effect=Exception("Redis setex failed"))
+        # Make setex raise error
+        fake_redis.setex = Mock(side_effect=Exception("Redis setex failed"))
 
-            with patch("priotag.utils.update_last_seen"):
-                # Should not raise, logs warning and continues
-                result = await verify_token(mock_response, "token123", fake_redis)
-                assert result.id == sample_user_data["id"]
+        with patch("priotag.utils.update_last_seen"):
+            # Should not raise, logs warning and continues
+            result = await verify_token(mock_response, "token123", fake_redis)
+            assert result.id == sample_user_data["id"]
 
     @pytest.mark.asyncio
-    async def test_update_last_seen_setex_throttle_error(self, fake_redis):
-        """Should handle error when setting throttle key in Redis."""
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client = AsyncMock()
-            mock_client_class.return_value.__aenter__.return_value = mock_client
+    async def test_update_last_seen_release_throttle_error(self, pb_client, fake_redis):
+        """Should handle error when releasing the throttle key in Redis."""
+        mock_response = Mock()
+        mock_response.status_code = 500
+        mock_response.text = "Server error"
+        pb_client.patch.return_value = mock_response
 
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_client.patch.return_value = mock_response
+        fake_redis.delete = Mock(side_effect=Exception("Redis delete failed"))
 
-            # Make setex raise error for throttle key
-            original_setex = fake_redis.setex
-
-            def setex_error(key, ttl, value):
-                if key.startswith("lastseen:"):
-                    raise Exception("Redis setex failed")
-                return original_setex(key, ttl, value)
-
-            fake_redis.setex = Mock(side_effect=setex_error)
-
-            # Should not raise, logs warning and continues
-            await update_last_seen("user123", "token123", fake_redis)
+        # Should not raise, logs warning and continues
+        await update_last_seen("user123", "token123", fake_redis)
 
-            # Should have attempted the update
-            mock_client.patch.assert_called_once()
+        pb_client.patch.assert_called_once()
+        fake_redis.delete.assert_called_once_with("lastseen:user123")